@@ -1,61 +1,109 @@
 import os
+import json
 import tempfile
 from pathlib import Path
-from fastapi import APIRouter, File, Header, HTTPException, Query, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.concurrency import run_in_threadpool
 from app.schemas import AskRequest, AskResponse
 from app.retriever import retrieve
 from app.guardrails import validate
-from app.generator import generate_answer
-from app.chunking import fixed_chunk
-from app.embeddings import embed_texts
+from app.generator import iter_answer, iter_extractive_answer
+from app.embeddings import embed_query
+from app.metrics import span, track_request
+from app.profiling import RequestProfile, profile_request, profiling_allowed
+from app.indexer import extract_chunks
 from app.ingest import read_file, SUPPORTED_EXTENSIONS
+from app.collection import Collection, DEFAULT_COLLECTION, parse_collection_keys
 
-router = APIRouter()
+NOT_FOUND_ANSWER = "Information not found in internal documents."
+BLOCKED_METADATA = {"confidence": "low", "source_documents": [], "similarity_score": 0.0}
 
 
-def create_routes(vector_store):
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_routes(collections):
+    # A fresh router per call, so several apps (e.g. the benchmark's
+    # per-configuration apps) can be built in one process.
+    router = APIRouter()
     max_upload_size = int(os.getenv("MAX_UPLOAD_SIZE_BYTES", "2000000"))
     docs_api_key = os.getenv("DOCS_API_KEY", "").strip()
-    data_dir = Path(__file__).resolve().parents[1] / "data"
+    collection_keys = parse_collection_keys(os.getenv("COLLECTION_API_KEYS", ""))
 
     def check_docs_access(x_api_key: str | None):
-        if docs_api_key and x_api_key != docs_api_key:
+        if docs_api_key and x_api_key != docs_api_key and x_api_key not in collection_keys:
             raise HTTPException(status_code=401, detail="Unauthorized")
 
-    def safe_doc_path(doc_name: str) -> Path:
+    def resolve_collection(requested: str | None, x_api_key: str | None, create: bool = False) -> Collection:
+        """
+        Pick the collection for a request.  A key bound to a collection
+        in COLLECTION_API_KEYS always gets that collection; asking for a
+        different one is forbidden.  Once any key is configured, other
+        collections than the default need DOCS_API_KEY or a bound key.
+        """
+        bound = collection_keys.get(x_api_key) if x_api_key else None
+        if bound and requested and requested != bound:
+            raise HTTPException(status_code=403, detail="API key not valid for this collection")
+        name = bound or requested or DEFAULT_COLLECTION
+        keys_configured = bool(docs_api_key or collection_keys)
+        if keys_configured and name != DEFAULT_COLLECTION and not bound and x_api_key != docs_api_key:
+            if not x_api_key:
+                raise HTTPException(status_code=401, detail="Unauthorized")
+            raise HTTPException(status_code=403, detail="API key not valid for this collection")
+        try:
+            return collections.get(name, create=create)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+    def safe_doc_path(collection: Collection, doc_name: str) -> Path:
         cleaned = Path(doc_name).name
         if not cleaned:
             raise HTTPException(status_code=400, detail="Invalid document name")
-        path = data_dir / cleaned
+        path = collection.data_dir / cleaned
         if not path.exists() or not path.is_file():
             raise HTTPException(status_code=404, detail="Document not found")
         return path
 
-    def list_indexed_documents() -> list[str]:
-        return sorted(set(vector_store.metadata))
+    def list_indexed_documents(collection: Collection) -> list[str]:
+        return collection.vector_store.documents()
 
-    async def process_text_document(filename: str, text: str):
-        chunks = await run_in_threadpool(fixed_chunk, text)
-        if not chunks:
+    async def process_document(collection: Collection, filename: str, paged: list[tuple[str, int | None]], path: Path):
+        if not paged:
             return False, "Empty file"
-        embeddings = await run_in_threadpool(embed_texts, chunks)
-        await run_in_threadpool(vector_store.add, embeddings, chunks, [filename] * len(chunks))
+        await run_in_threadpool(collection.indexer.index_chunks, filename, paged, path)
         return True, None
 
+    @router.get("/collections")
+    def list_collections(x_api_key: str | None = Header(default=None, alias="X-API-Key")):
+        check_docs_access(x_api_key)
+        bound = collection_keys.get(x_api_key) if x_api_key else None
+        loaded = {c.name for c in collections.loaded()}
+        names = [bound] if bound else collections.names()
+        return {"collections": [{"name": n, "loaded": n in loaded} for n in names]}
+
     @router.get("/documents")
-    def documents(x_api_key: str | None = Header(default=None, alias="X-API-Key")):
+    async def documents(
+        collection: str | None = Query(default=None),
+        x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+    ):
         check_docs_access(x_api_key)
-        return {"documents": list_indexed_documents()}
+        coll = await run_in_threadpool(resolve_collection, collection, x_api_key)
+        return {"documents": list_indexed_documents(coll)}
 
     @router.get("/documents/content")
     async def document_content(
         name: str = Query(..., min_length=1),
+        collection: str | None = Query(default=None),
         x_api_key: str | None = Header(default=None, alias="X-API-Key"),
     ):
         check_docs_access(x_api_key)
-        file_path = safe_doc_path(name)
+        coll = await run_in_threadpool(resolve_collection, collection, x_api_key)
+        file_path = safe_doc_path(coll, name)
 
         try:
             content = await run_in_threadpool(read_file, str(file_path))
@@ -72,24 +120,28 @@ def create_routes(vector_store):
         name: str = Query(..., min_length=1),
         x_api_key: str | None = Header(default=None, alias="X-API-Key"),
         key: str | None = Query(default=None),
+        collection: str | None = Query(default=None),
     ):
         check_docs_access(x_api_key or key)
-        file_path = safe_doc_path(name)
+        coll = await run_in_threadpool(resolve_collection, collection, x_api_key or key)
+        file_path = safe_doc_path(coll, name)
         return FileResponse(file_path)
 
     @router.post("/documents/upload")
     async def upload_documents(
         files: list[UploadFile] = File(...),
+        collection: str | None = Query(default=None),
         x_api_key: str | None = Header(default=None, alias="X-API-Key"),
     ):
         check_docs_access(x_api_key)
+        coll = await run_in_threadpool(resolve_collection, collection, x_api_key, True)
 
         if not files:
             raise HTTPException(status_code=400, detail="No files provided")
 
         added: list[str] = []
         skipped: list[dict] = []
-        existing = set(list_indexed_documents())
+        existing = set(list_indexed_documents(coll))
 
         for file in files:
             filename = Path(file.filename or "").name
@@ -103,23 +155,28 @@ def create_routes(vector_store):
                 skipped.append({"name": filename, "reason": "Already indexed"})
                 continue
 
+            # A data file that startup ingestion has not reached yet.
+            if (coll.data_dir / filename).exists():
+                skipped.append({"name": filename, "reason": "A file with this name already exists"})
+                continue
+
             raw = await file.read()
             if len(raw) > max_upload_size:
                 skipped.append({"name": filename, "reason": f"File exceeds {max_upload_size} bytes limit"})
                 continue
 
             # Save file to data/ first, then extract text
-            dest = data_dir / filename
+            dest = coll.data_dir / filename
             await run_in_threadpool(dest.write_bytes, raw)
 
             try:
-                text = await run_in_threadpool(read_file, str(dest))
+                paged = await run_in_threadpool(extract_chunks, dest)
             except Exception as e:
                 dest.unlink(missing_ok=True)
                 skipped.append({"name": filename, "reason": f"Cannot extract text: {e}"})
                 continue
 
-            ok, reason = await process_text_document(filename, text)
+            ok, reason = await process_document(coll, filename, paged, dest)
             if not ok:
                 dest.unlink(missing_ok=True)
                 skipped.append({"name": filename, "reason": reason})
@@ -131,30 +188,71 @@ def create_routes(vector_store):
         return {
             "added": added,
             "skipped": skipped,
-            "documents": list_indexed_documents(),
+            "documents": list_indexed_documents(coll),
         }
 
-    @router.post("/ask-recruiter", response_model=AskResponse)
-    def ask(request: AskRequest):
-        results = retrieve(
-            request.question,
-            vector_store,
-            top_k=request.top_k,
-            source_filter=request.source_filter,
-        )
+    def answer_for(request: AskRequest, x_api_key: str | None):
+        """
+        Retrieve, apply guardrails and start answering a question.
+
+        Returns (metadata, pieces): confidence, sources, score and
+        index_complete, and an iterator over the answer sections.  A
+        paraphrase of a question already answered with the same options
+        against the same index is served from the collection's semantic
+        cache, skipping search and generation.  index_complete is False
+        while the collection is still ingesting, i.e. the answer may miss
+        documents.
+        """
+        collection = resolve_collection(request.collection, x_api_key)
+        cache = collection.semantic_cache if collection.index_complete else None
+        cache_key = json.dumps(request.model_dump(exclude={"question", "collection"}), sort_keys=True)
+        version = collection.vector_store.version
+        with span("retrieve"):
+            with span("embed_query"):
+                query_vec = embed_query(request.question)
+            cached = cache.get(query_vec, cache_key, version) if cache is not None else None
+            if cached is not None:
+                metadata, pieces = cached
+                collection.record_hits(metadata["source_documents"])
+                return {**metadata, "index_complete": True}, iter(pieces)
+            results = retrieve(
+                request.question,
+                collection.vector_store,
+                top_k=request.top_k,
+                source_filter=request.source_filter,
+                query_vec=query_vec,
+            )
+        collection.record_hits({r["source"] for r in results})
 
         # Skip guardrails check when disabled from the UI
-        if request.guardrails_enabled and not validate(
-            results, threshold=request.confidence_threshold
-        ):
-            return AskResponse(
-                answer="Information not found in internal documents.",
-                confidence="low",
-                source_documents=[],
-                similarity_score=0.0,
+        with span("guardrails"):
+            blocked = request.guardrails_enabled and not validate(
+                results, threshold=request.confidence_threshold
             )
+        if blocked:
+            metadata, pieces = BLOCKED_METADATA, iter([NOT_FOUND_ANSWER])
+        else:
+            metadata, pieces = describe_results(results, request), answer_pieces(results, query_vec, request)
+        if cache is not None:
+            pieces = caching(pieces, lambda answer: cache.put(query_vec, cache_key, version, (metadata, answer)))
+        return {**metadata, "index_complete": collection.index_complete}, pieces
+
+    def caching(pieces, store):
+        """Yield the answer sections, then pass the complete list to `store`."""
+        answer = []
+        for piece in pieces:
+            answer.append(piece)
+            yield piece
+        store(answer)
+
+    def answer_pieces(results: list[dict], query_vec, request: AskRequest):
+        """Answer sections for the requested answer mode."""
+        if request.answer_mode == "extractive":
+            return iter_extractive_answer(results, query_vec, request.max_tokens)
+        return iter_answer(results)
 
-        answer = generate_answer(results)
+    def describe_results(results: list[dict], request: AskRequest) -> dict:
+        """Confidence, cited sources and top score for a result set."""
         source_documents = list(dict.fromkeys(r["source"] for r in results))
         top_score = results[0]["score"] if results else 0.0
 
@@ -163,12 +261,75 @@ def create_routes(vector_store):
             else "medium" if top_score >= request.confidence_threshold
             else "low"
         )
+        return {
+            "confidence": confidence,
+            "source_documents": source_documents,
+            "similarity_score": top_score,
+        }
 
-        return AskResponse(
-            answer=answer,
-            confidence=confidence,
-            source_documents=source_documents,
-            similarity_score=top_score,
-        )
+    def wants_profile(x_profile: str | None, x_api_key: str | None) -> bool:
+        profile = bool(x_profile) and x_profile not in ("0", "false")
+        if profile and not profiling_allowed(x_api_key):
+            raise HTTPException(status_code=403, detail="Profiling requires DOCS_API_KEY")
+        return profile
+
+    @router.post("/ask-recruiter", response_model=AskResponse)
+    def ask(
+        request: AskRequest,
+        response: Response,
+        x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+        x_profile: str | None = Header(default=None, alias="X-Profile"),
+    ):
+        profile = wants_profile(x_profile, x_api_key)
+
+        with track_request("ask", detail=repr(request.question[:80])), \
+                profile_request(profile, repr(request.question[:80])) as profile_id:
+            if profile_id:
+                response.headers["X-Profile-Id"] = profile_id
+            metadata, pieces = answer_for(request, x_api_key)
+            with span("generate"):
+                answer = "".join(pieces)
+            return AskResponse(answer=answer, **metadata)
+
+    @router.post("/ask-recruiter/stream")
+    async def ask_stream(
+        request: AskRequest,
+        x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+        x_profile: str | None = Header(default=None, alias="X-Profile"),
+    ):
+        """
+        /ask-recruiter as Server-Sent Events.
+
+        Emits a `metadata` event (confidence, sources, score,
+        index_complete) as soon as retrieval finishes, then one `answer`
+        event per answer section, then `done`.  Concatenating the `answer` texts gives exactly the
+        /ask-recruiter answer.
+        """
+        profile = RequestProfile(repr(request.question[:80])) if wants_profile(x_profile, x_api_key) else None
+        # Resolve before streaming starts so auth errors are plain HTTP errors.
+        await run_in_threadpool(resolve_collection, request.collection, x_api_key)
+
+        def run(fn, *args):
+            # Each step may land on a different threadpool thread; profile
+            # whichever one runs it.
+            return profile.call(fn, *args) if profile else fn(*args)
+
+        async def events():
+            with track_request("ask_stream", detail=repr(request.question[:80])):
+                try:
+                    metadata, pieces = await run_in_threadpool(run, answer_for, request, x_api_key)
+                    yield _sse("metadata", metadata)
+                    with span("generate"):
+                        while (piece := await run_in_threadpool(run, next, pieces, None)) is not None:
+                            yield _sse("answer", {"text": piece})
+                    yield _sse("done", {})
+                finally:
+                    if profile:
+                        profile.save()
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        if profile:
+            headers["X-Profile-Id"] = profile.id
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
 
     return router
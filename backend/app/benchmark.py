@@ -0,0 +1,303 @@
+"""
+benchmark.py — Offline performance benchmark for the RAG pipeline.
+
+Builds synthetic corpora of a configurable size from the sample
+documents in data/, then times each stage of the pipeline for every
+(embedding model, index type) configuration:
+
+  • chunk   — fixed_chunk over the synthetic documents
+  • embed   — embed_texts in fixed-size batches
+  • search  — VectorStore.search with pre-embedded queries, plus
+              recall@k against exact float32 search and index size
+  • ask     — POST /ask-recruiter end to end (default model only,
+              since retrieval always embeds queries with it)
+
+Results are printed as a table and optionally written as JSON so runs
+can be compared.  Everything runs on CPU with no network access; the
+embedding models must already be in the local Hugging Face cache.
+
+Usage (from backend/):
+    python -m app.benchmark --sizes 1000 5000 --output bench.json
+    python -m app.benchmark --sizes 1000 --compare bench.json
+"""
+
+import os
+
+# Never reach out to the Hugging Face Hub from a benchmark run.
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+import faiss
+import numpy as np
+
+from app.chunking import fixed_chunk
+from app.embeddings import embed_texts, embed_query, get_dimension, MODELS, DEFAULT_MODEL
+from app.ingest import load_documents, load_questions
+from app.sharded_store import ShardedVectorStore
+from app.vector_store import VectorStore
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+# Index configurations under test: name -> factory(dimension, **options),
+# options being extra VectorStore arguments (e.g. train_min).
+INDEX_TYPES: dict[str, Callable[..., Any]] = {
+    "flat": lambda dim, **kw: VectorStore(dim, **kw),
+    "sqfp16": lambda dim, **kw: VectorStore(dim, index_type="sqfp16", **kw),
+    "sq8": lambda dim, **kw: VectorStore(dim, index_type="sq8", **kw),
+    "sq8+rs": lambda dim, **kw: VectorStore(dim, index_type="sq8", rescore_factor=4, **kw),
+    "pca/4": lambda dim, **kw: VectorStore(dim, reduce_dim=dim // 4, **kw),
+    "pca/4+sq8": lambda dim, **kw: VectorStore(dim, index_type="sq8", reduce_dim=dim // 4, **kw),
+    "shard4": lambda dim, **kw: ShardedVectorStore(dim, shards=4, **kw),
+}
+
+STAGES = ("chunk", "embed", "search", "ask")
+
+
+# ── Inputs ──────────────────────────────────────────────────────────────
+def synthetic_corpus(n_chunks: int, seed: int = 0, doc_chars: int = 4000) -> list[dict]:
+    """
+    Build documents that chunk to roughly `n_chunks` chunks.
+
+    Lines from the sample documents are shuffled into new documents of
+    about `doc_chars` characters, so the vocabulary and line structure
+    match the real corpus while the size is arbitrary.
+    """
+    lines = [
+        line
+        for doc in load_documents(str(DATA_DIR))
+        for line in doc["text"].splitlines()
+        if line.strip()
+    ]
+    rng = random.Random(seed)
+    stride = 500 - 50
+    target_chars = n_chunks * stride
+
+    documents = []
+    total = 0
+    while total < target_chars:
+        parts, size = [], 0
+        while size < doc_chars:
+            line = rng.choice(lines)
+            parts.append(line)
+            size += len(line) + 1
+        text = "\n".join(parts)
+        documents.append({"text": text, "source": f"synthetic_{len(documents):05d}.txt"})
+        total += len(text)
+    return documents
+
+
+# ── Timing helpers ──────────────────────────────────────────────────────
+def summarize(latencies: list[float], items: int, unit: str) -> dict:
+    """Throughput and latency percentiles for one stage."""
+    if not latencies:
+        return {}
+    total = sum(latencies)
+    ms = np.array(latencies) * 1000.0
+    return {
+        "unit": unit,
+        "calls": len(latencies),
+        "items": items,
+        "total_s": round(total, 4),
+        "throughput_per_s": round(items / total, 2) if total > 0 else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# ── Stages ──────────────────────────────────────────────────────────────
+def bench_chunk(documents: list[dict]):
+    chunks, sources, latencies = [], [], []
+    for doc in documents:
+        doc_chunks, elapsed = _timed(fixed_chunk, doc["text"])
+        latencies.append(elapsed)
+        chunks.extend(doc_chunks)
+        sources.extend([doc["source"]] * len(doc_chunks))
+    return chunks, sources, summarize(latencies, len(chunks), "chunks")
+
+
+def bench_embed(chunks: list[str], model: str, batch_size: int):
+    batches, latencies = [], []
+    for i in range(0, len(chunks), batch_size):
+        emb, elapsed = _timed(embed_texts, chunks[i:i + batch_size], model, use_cache=False)
+        batches.append(np.asarray(emb, dtype="float32"))
+        latencies.append(elapsed)
+    return np.vstack(batches), summarize(latencies, len(chunks), "chunks")
+
+
+def bench_search(store, questions: list[str], model: str, n_queries: int, top_k: int, embeddings, chunks):
+    query_vecs = [embed_query(q, model) for q in questions]
+    latencies = []
+    for i in range(n_queries):
+        _, elapsed = _timed(store.search, query_vecs[i % len(query_vecs)], top_k)
+        latencies.append(elapsed)
+    stats = summarize(latencies, n_queries, "queries")
+
+    # Overlap with brute-force float32 results, to see what quantization costs.
+    overlap = []
+    for q in query_vecs:
+        exact = {chunks[i] for i in np.argsort(-(embeddings @ q[0]), kind="stable")[:top_k]}
+        found = {r["text"] for r in store.search(q, top_k)}
+        overlap.append(len(exact & found) / len(exact))
+    stats["recall_vs_exact"] = round(float(np.mean(overlap)), 4)
+    stats["index_mb"] = round(store.memory_bytes() / 2**20, 3)
+    return stats
+
+
+def bench_ask(store, questions: list[str], n_queries: int, top_k: int):
+    try:
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+    except ImportError:
+        log.warning("httpx not installed — skipping the ask stage")
+        return {}
+    from app.api import create_routes
+    from app.collection import CollectionManager
+    from app.indexer import Indexer
+
+    app = FastAPI()
+    collections = CollectionManager.single(store, Indexer(store, tempfile.mkdtemp()))
+    # Questions repeat across iterations; time the full pipeline, not cache hits.
+    collections.get().semantic_cache = None
+    app.include_router(create_routes(collections))
+    client = TestClient(app)
+
+    latencies = []
+    for i in range(n_queries):
+        payload = {"question": questions[i % len(questions)], "top_k": top_k}
+        response, elapsed = _timed(client.post, "/ask-recruiter", json=payload)
+        response.raise_for_status()
+        latencies.append(elapsed)
+    return summarize(latencies, n_queries, "requests")
+
+
+def run_model(size: int, documents, questions, model: str, args) -> list[dict]:
+    """Chunk and embed once per model, then benchmark every index type."""
+    chunks, sources, chunk_stats = bench_chunk(documents)
+    embeddings, embed_stats = bench_embed(chunks, model, args.batch_size)
+    return [
+        run_index(size, documents, questions, model, index_type, args,
+                  chunks, sources, embeddings, chunk_stats, embed_stats)
+        for index_type in args.indexes
+    ]
+
+
+def run_index(size, documents, questions, model, index_type, args,
+              chunks, sources, embeddings, chunk_stats, embed_stats) -> dict:
+    # Train on whatever the corpus holds, so small sizes still measure
+    # the configured index rather than the exact staging index.
+    store = INDEX_TYPES[index_type](get_dimension(model), train_min=0)
+    _, build_s = _timed(store.add, embeddings, chunks, sources)
+
+    stages = {
+        "chunk": chunk_stats,
+        "embed": embed_stats,
+        "search": bench_search(store, questions, model, args.queries, args.top_k, embeddings, chunks),
+        "ask": bench_ask(store, questions, args.queries, args.top_k) if model == DEFAULT_MODEL else {},
+    }
+    return {
+        "model": model,
+        "index": index_type,
+        "size": size,
+        "corpus_documents": len(documents),
+        "corpus_chunks": len(chunks),
+        "index_build_s": round(build_s, 4),
+        "stages": stages,
+    }
+
+
+# ── Reporting ───────────────────────────────────────────────────────────
+def print_table(results: list[dict], baseline: list[dict] | None = None) -> None:
+    previous = {}
+    for r in baseline or []:
+        for stage, stats in r["stages"].items():
+            previous[(r["model"], r["index"], r["size"], stage)] = stats
+
+    header = (
+        f"{'model':<11} {'index':<10} {'chunks':>7} {'stage':<7} {'thru/s':>10} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'recall':>7} {'MB':>8}"
+    )
+    if baseline:
+        header += f" {'Δp95':>8}"
+    print(header)
+    print("─" * len(header))
+    for r in results:
+        for stage in STAGES:
+            s = r["stages"].get(stage)
+            if not s:
+                continue
+            line = (
+                f"{r['model']:<11} {r['index']:<10} {r['corpus_chunks']:>7} {stage:<7} "
+                f"{s['throughput_per_s'] or 0:>10.1f} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f}"
+            )
+            if "recall_vs_exact" in s:
+                line += f" {s['recall_vs_exact']:>7.3f} {s['index_mb']:>8.2f}"
+            else:
+                line += " " * 17
+            old = previous.get((r["model"], r["index"], r["size"], stage))
+            if baseline and old:
+                line += f" {(s['p95_ms'] / old['p95_ms'] - 1) * 100:>+7.1f}%"
+            print(line)
+
+
+def environment() -> dict:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "faiss": getattr(faiss, "__version__", "unknown"),
+        "numpy": np.__version__,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, embedding, search and ask latency.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000], help="Corpus sizes in chunks")
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL], choices=list(MODELS))
+    parser.add_argument("--indexes", nargs="+", default=["flat"], choices=list(INDEX_TYPES))
+    parser.add_argument("--queries", type=int, default=200, help="Queries per search/ask stage")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embed call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--compare", type=Path, help="Previous JSON results to diff against")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    questions = load_questions()
+
+    results = []
+    for size in args.sizes:
+        documents = synthetic_corpus(size, seed=args.seed)
+        for model in args.models:
+            results.extend(run_model(size, documents, questions, model, args))
+
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else None
+    print_table(results, baseline)
+
+    if args.output:
+        report = {"environment": environment(), "args": {k: str(v) for k, v in vars(args).items()}, "results": results}
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,20 @@
-def fixed_chunk(text, size=500, overlap=50):
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+# Recorded with each indexed document so a chunker change forces re-indexing
+CHUNKER_ID = f"fixed-{CHUNK_SIZE}/{CHUNK_OVERLAP}"
+
+
+def fixed_chunk(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
     chunks = []
     for i in range(0, len(text), size - overlap):
         chunks.append(text[i:i + size])
     return chunks
+
+
+def chunk_pages(pages, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Chunk a stream of (page, text) pairs, yielding (chunk, page)."""
+    for page, text in pages:
+        if not text.strip():
+            continue
+        for chunk in fixed_chunk(text, size, overlap):
+            yield chunk, page
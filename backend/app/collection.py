@@ -0,0 +1,302 @@
+"""
+collection.py — Named document collections with isolated indexes.
+
+Each collection (one per client account, say) has its own data folder,
+vector store and indexer, so a query only scans that tenant's vectors.
+The "default" collection is the historical backend/data folder; every
+other collection lives under COLLECTIONS_DIR/<name>/data.
+
+A collection is usable as soon as it is opened: its documents are
+ingested one by one in a background thread (most-queried, then
+smallest, first) and `index_complete` stays False until that finishes.
+INCREMENTAL_INDEXING=0 ingests synchronously instead.
+
+Collections are loaded lazily on first use and evicted after
+COLLECTION_IDLE_SECONDS without requests (the default collection is
+pinned).  Requests pick a collection explicitly, or are bound to one by
+their API key via COLLECTION_API_KEYS="key1:client_x,key2:client_y".
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Optional
+
+from app import snapshot
+from app.embeddings import get_dimension
+from app.indexer import Indexer
+from app.metadata_store import MetadataStore
+from app.semantic_cache import SemanticCache, SEMANTIC_CACHE_SIZE
+
+log = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+VALID_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+COLLECTIONS_DIR = Path(os.getenv("COLLECTIONS_DIR", str(BACKEND_DIR / "collections")))
+COLLECTION_IDLE_SECONDS = float(os.getenv("COLLECTION_IDLE_SECONDS", "1800"))
+INCREMENTAL_INDEXING = os.getenv("INCREMENTAL_INDEXING", "1").lower() not in ("0", "false", "no")
+
+
+def parse_collection_keys(raw: str) -> dict[str, str]:
+    """'key1:client_x,key2:client_y' -> {'key1': 'client_x', ...}."""
+    keys = {}
+    for pair in raw.split(","):
+        key, _, name = pair.strip().partition(":")
+        if key and name:
+            keys[key.strip()] = name.strip()
+    return keys
+
+
+class Collection:
+    def __init__(self, name: str, data_dir: Path, storage_dir: Path, vector_store, indexer):
+        self.name = name
+        self.data_dir = data_dir
+        self.storage_dir = storage_dir
+        self.vector_store = vector_store
+        self.indexer = indexer
+        self.watcher = None
+        self.last_used = time.monotonic()
+        self.semantic_cache = SemanticCache(vector_store.dimension) if SEMANTIC_CACHE_SIZE > 0 else None
+        # Set once startup ingestion has finished; until then queries are
+        # answered from the documents indexed so far.
+        self.indexed = threading.Event()
+        self.indexed.set()
+        # Settings the store was built with, for save_index(); None for
+        # stores not managed by a CollectionManager.
+        self.index_settings: Optional[dict] = None
+        self.saved_version: Optional[int] = None
+        self._save_lock = threading.Lock()
+        self._hits: Counter[str] = Counter()
+        self._hits_lock = threading.Lock()
+
+    @property
+    def index_complete(self) -> bool:
+        return self.indexed.is_set()
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    def record_hits(self, sources) -> None:
+        """Count documents returned for a query (flushed to the metadata store)."""
+        with self._hits_lock:
+            self._hits.update(sources)
+
+    def save_index(self) -> None:
+        """Save the index next to metadata.db, so a restart need not re-embed."""
+        with self._save_lock:
+            version = self.vector_store.version
+            if self.index_settings is None or not self.index_complete or version == self.saved_version:
+                return
+            try:
+                snapshot.save_local(self.vector_store, self.storage_dir, self.index_settings)
+                self.saved_version = version
+            except (OSError, RuntimeError) as e:
+                log.warning("Cannot save index of collection %s: %s", self.name, e)
+
+    def flush_hits(self) -> None:
+        with self._hits_lock:
+            hits, self._hits = dict(self._hits), Counter()
+        self.vector_store.metadata_store.add_query_hits(hits)
+
+
+class CollectionManager:
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        default_data_dir: Path = BACKEND_DIR / "data",
+        root_dir: Path = COLLECTIONS_DIR,
+        idle_seconds: float = COLLECTION_IDLE_SECONDS,
+        watcher_factory: Optional[Callable[[Indexer], object]] = None,
+        snapshot_dir: Optional[Path] = None,
+        incremental: bool = INCREMENTAL_INDEXING,
+    ):
+        # Resolved from the default model on first load when not given, so
+        # building the manager does not load the model.
+        self._dimension = dimension
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.incremental = incremental
+        self.default_data_dir = Path(default_data_dir)
+        self.root_dir = Path(root_dir)
+        self.idle_seconds = idle_seconds
+        self.watcher_factory = watcher_factory
+
+        self._loaded: dict[str, Collection] = {}
+        # Indexers of collections currently being loaded, for progress reports.
+        self.loading: dict[str, Indexer] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._evictor: Optional[threading.Thread] = None
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = get_dimension()
+        return self._dimension
+
+    @classmethod
+    def single(cls, vector_store, indexer) -> "CollectionManager":
+        """A manager serving one pre-built store as the default collection."""
+        manager = cls(vector_store.dimension, default_data_dir=indexer.data_dir)
+        manager._loaded[DEFAULT_COLLECTION] = Collection(
+            DEFAULT_COLLECTION, indexer.data_dir, manager.storage_dir(DEFAULT_COLLECTION),
+            vector_store, indexer,
+        )
+        return manager
+
+    # ── Layout ──────────────────────────────────────────────────────────
+    def data_dir(self, name: str) -> Path:
+        if name == DEFAULT_COLLECTION:
+            return self.default_data_dir
+        return self.root_dir / name / "data"
+
+    def storage_dir(self, name: str) -> Path:
+        """Where a collection's metadata database and index state live."""
+        return self.root_dir / name
+
+    def exists(self, name: str) -> bool:
+        return VALID_NAME.match(name) is not None and self.data_dir(name).is_dir()
+
+    def names(self) -> list[str]:
+        names = {DEFAULT_COLLECTION}
+        if self.root_dir.is_dir():
+            names.update(p.parent.name for p in self.root_dir.glob("*/data") if p.is_dir())
+        return sorted(n for n in names if VALID_NAME.match(n))
+
+    def loaded(self) -> list[Collection]:
+        return list(self._loaded.values())
+
+    # ── Loading / eviction ──────────────────────────────────────────────
+    def _load(self, name: str) -> Collection:
+        data_dir = self.data_dir(name)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        storage_dir = self.storage_dir(name)
+        start = time.perf_counter()
+
+        # A fresh default collection can start from a prebuilt snapshot
+        # instead of embedding its documents; SnapshotError aborts startup.
+        manifest = None
+        if name == DEFAULT_COLLECTION and self.snapshot_dir and not (storage_dir / "metadata.db").exists():
+            manifest = snapshot.install(self.snapshot_dir, storage_dir, self.dimension)
+            log.info("Installed snapshot %s (%d chunks)", self.snapshot_dir, manifest["chunks"])
+
+        # Otherwise reuse the index saved at the last shutdown, if it
+        # still matches metadata.db, and only re-embed when it does not.
+        metadata_store = MetadataStore(storage_dir / "metadata.db")
+        saved = None
+        if manifest is not None:
+            vector_store = snapshot.open_store(self.snapshot_dir, storage_dir, manifest, metadata_store)
+            settings = {**{key: manifest[key] for key in snapshot.SETTINGS}, "snapshot": True}
+        elif (saved := snapshot.load_local(storage_dir, metadata_store, self.dimension)) is not None:
+            vector_store, settings = saved
+        else:
+            settings = snapshot.current_settings()
+            vector_store = snapshot.make_store(self.dimension, metadata_store, settings, storage_dir)
+        prebuilt = manifest is not None or saved is not None
+
+        indexer = Indexer(vector_store, data_dir)
+        collection = Collection(name, data_dir, storage_dir, vector_store, indexer)
+        collection.index_settings = settings
+        if saved is not None:
+            collection.saved_version = vector_store.version
+        collection.indexed.clear()
+        self.loading[name] = indexer
+
+        def ingest() -> None:
+            try:
+                restored = indexer.adopt() if prebuilt else indexer.restore()
+                indexed = indexer.index_folder(priority=metadata_store.query_hits())
+                log.info(
+                    "Loaded collection %s (%d chunks restored, %d indexed, %.1fs)",
+                    name, restored, indexed, time.perf_counter() - start,
+                )
+            except Exception:
+                log.exception("Ingestion of collection %s failed", name)
+            finally:
+                self.loading.pop(name, None)
+                collection.indexed.set()
+            collection.save_index()
+            if self.watcher_factory is not None:
+                collection.watcher = self.watcher_factory(indexer)
+                collection.watcher.start()
+
+        if self.incremental:
+            # Serve straight away; documents become searchable one by one.
+            threading.Thread(target=ingest, name=f"ingest-{name}", daemon=True).start()
+        else:
+            ingest()
+        return collection
+
+    def get(self, name: Optional[str] = None, create: bool = False) -> Collection:
+        """
+        Return a collection, loading it on first use.
+
+        Raises KeyError for unknown collections unless `create` is set,
+        and ValueError for invalid names.
+        """
+        name = name or DEFAULT_COLLECTION
+        if not VALID_NAME.match(name):
+            raise ValueError(f"Invalid collection name: {name!r}")
+
+        collection = self._loaded.get(name)
+        if collection is None:
+            if not create and not self.exists(name) and name != DEFAULT_COLLECTION:
+                raise KeyError(name)
+            with self._lock:
+                load_lock = self._load_locks.setdefault(name, threading.Lock())
+            # Per-name lock: concurrent first requests load it once, and
+            # loading one tenant never blocks requests to another.
+            with load_lock:
+                collection = self._loaded.get(name)
+                if collection is None:
+                    collection = self._load(name)
+                    self._loaded[name] = collection
+        collection.touch()
+        return collection
+
+    def evict_idle(self) -> list[str]:
+        """Unload collections idle for longer than idle_seconds."""
+        now = time.monotonic()
+        evicted = []
+        for name, collection in list(self._loaded.items()):
+            if (
+                name == DEFAULT_COLLECTION
+                or not collection.index_complete
+                or now - collection.last_used < self.idle_seconds
+            ):
+                continue
+            with self._load_locks.get(name, self._lock):
+                if self._loaded.pop(name, None) is None:
+                    continue
+            if collection.watcher is not None:
+                collection.watcher.stop()
+            collection.flush_hits()
+            collection.save_index()
+            evicted.append(name)
+            log.info("Evicted idle collection %s", name)
+        return evicted
+
+    def _evict_loop(self) -> None:
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while not self._stop.wait(interval):
+            for collection in self.loaded():
+                collection.flush_hits()
+            self.evict_idle()
+
+    def start(self) -> None:
+        self._evictor = threading.Thread(target=self._evict_loop, name="collection-evictor", daemon=True)
+        self._evictor.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for collection in self.loaded():
+            if collection.watcher is not None:
+                collection.watcher.stop()
+            collection.flush_hits()
+            collection.save_index()
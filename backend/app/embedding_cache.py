@@ -0,0 +1,134 @@
+"""
+embedding_cache.py — Persistent chunk-embedding cache.
+
+Maps (model, sha256 of chunk text) to the normalised embedding, so text
+that was embedded once — a repeated policy header, a legal footer, a
+document uploaded again or restored after a restart — is never sent
+through the encoder again.  `embed_texts` consults it before running
+the model during ingestion; query-time and offline callers (extractive
+answers, benchmark, evaluation) pass use_cache=False.  Hits and misses
+are counted in documind_cache_{hits,misses}_total with cache="embedding".
+
+The cache is a SQLite file (WAL mode, one connection per thread; see
+sqlite_db.py) shared by every collection.  It keeps at most
+EMBEDDING_CACHE_MAX_ROWS embeddings: past that, the least recently
+written are pruned (0 keeps everything).  Set EMBEDDING_CACHE=0 to
+disable it.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.sqlite_db import SQLiteDatabase
+
+log = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1").lower() not in ("0", "false", "no")
+EMBEDDING_CACHE_PATH = Path(os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    str(Path(os.getenv("COLLECTIONS_DIR", str(BACKEND_DIR / "collections"))) / "embedding_cache.db"),
+))
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model   TEXT NOT NULL,
+    hash    BLOB NOT NULL,
+    vector  BLOB NOT NULL,
+    added   REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (model, hash)
+) WITHOUT ROWID;
+"""
+
+# SQLite's default limit on host parameters per statement is 999.
+_BATCH = 900
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache(SQLiteDatabase):
+    def __init__(self, path: str | Path, max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        super().__init__(path, SCHEMA)
+        self.max_rows = max_rows
+        with self._write_lock:
+            conn = self._conn()
+            # Cache files from before pruning have no `added` column.
+            if "added" not in {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}:
+                conn.execute("ALTER TABLE embeddings ADD COLUMN added REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_added ON embeddings(added)")
+        # Upper bound on the row count (a replaced row is counted twice),
+        # so rows are only counted once pruning may be needed.
+        self._rows = self.count()
+
+    def get_many(self, model: str, hashes: list[bytes]) -> dict[bytes, np.ndarray]:
+        """hash -> vector for the hashes that are cached."""
+        found: dict[bytes, np.ndarray] = {}
+        conn = self._conn()
+        for i in range(0, len(hashes), _BATCH):
+            batch = hashes[i:i + _BATCH]
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                [model, *batch],
+            )
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype="float32")
+        return found
+
+    def put_many(self, model: str, items: list[tuple[bytes, np.ndarray]]) -> None:
+        now = time.time()
+        rows = [(model, digest, np.asarray(vec, dtype="float32").tobytes(), now) for digest, vec in items]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, added) VALUES (?, ?, ?, ?)", rows
+            )
+            self._rows += len(rows)
+            if 0 < self.max_rows < self._rows:
+                self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop the least recently written rows, down to 90% of max_rows."""
+        self._rows = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if self._rows <= self.max_rows:
+            return
+        excess = self._rows - int(self.max_rows * 0.9)
+        conn.execute(
+            "DELETE FROM embeddings WHERE (model, hash) IN "
+            "(SELECT model, hash FROM embeddings ORDER BY added LIMIT ?)",
+            (excess,),
+        )
+        self._rows -= excess
+        log.info("Pruned %d cached embeddings (limit %d)", excess, self.max_rows)
+
+    def count(self) -> int:
+        return self._read("SELECT COUNT(*) FROM embeddings")[0][0]
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """The process-wide cache, opened on first use; None when disabled or unavailable."""
+    global _cache, EMBEDDING_CACHE
+    if not EMBEDDING_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+            except (OSError, sqlite3.Error) as e:
+                log.warning("Embedding cache unavailable at %s (%s) — embedding without it", EMBEDDING_CACHE_PATH, e)
+                EMBEDDING_CACHE = False
+                return None
+    return _cache
@@ -5,13 +5,21 @@ Supports two pre-downloaded models:
   • all-MiniLM-L6-v2   — fast, 384-dim   (default, good for most use-cases)
   • all-mpnet-base-v2   — accurate, 768-dim (better quality, slightly slower)
 
-Both models are loaded eagerly at import time so that the first
-query does not incur a cold-start penalty.
+Models are loaded on first use, or all at once by `load_models()` — which
+the server runs in its background startup task, so the process answers
+health checks while the weights are still loading.
 """
 
+import os
+import time
 import logging
+import threading
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from app.embedding_cache import get_cache, text_hash
+from app.metrics import CACHE_HITS, CACHE_MISSES
+
 log = logging.getLogger(__name__)
 
 # ── Available models ────────────────────────────────────────────────────
@@ -22,25 +30,135 @@ MODELS = {
 
 DEFAULT_MODEL = "MiniLM-L6"
 
-# ── Eager-load both models at startup ───────────────────────────────────
+# Padded tokens per encode batch (bounds memory), largest batch, and the
+# per-batch latency above which the token budget is reduced.
+ENCODE_TOKEN_BUDGET = int(os.getenv("ENCODE_TOKEN_BUDGET", "16384"))
+ENCODE_MAX_BATCH = int(os.getenv("ENCODE_MAX_BATCH", "128"))
+ENCODE_BATCH_SECONDS = float(os.getenv("ENCODE_BATCH_SECONDS", "2.0"))
+
+# ── Lazy loading ────────────────────────────────────────────────────────
 _loaded: dict[str, SentenceTransformer] = {}
+_status: dict[str, str] = {label: "not loaded" for label in MODELS}
+_load_lock = threading.Lock()
 
-for label, hf_name in MODELS.items():
-    log.info("Loading embedding model: %s (%s)", label, hf_name)
-    _loaded[label] = SentenceTransformer(hf_name)
-    log.info("Loaded %s  —  dim=%d", label, _loaded[label].get_sentence_embedding_dimension())
 
+def _load(label: str) -> SentenceTransformer:
+    with _load_lock:
+        if label not in _loaded:
+            hf_name = MODELS[label]
+            log.info("Loading embedding model: %s (%s)", label, hf_name)
+            _status[label] = "loading"
+            try:
+                model = SentenceTransformer(hf_name)
+            except Exception as e:
+                _status[label] = f"error: {e}"
+                raise
+            _loaded[label] = model
+            _status[label] = "loaded"
+            log.info("Loaded %s  —  dim=%d", label, model.get_sentence_embedding_dimension())
+    return _loaded[label]
 
-def get_model(name: str | None = None) -> SentenceTransformer:
-    """Return the requested model or the default."""
-    key = name if name in _loaded else DEFAULT_MODEL
-    return _loaded[key]
+
+def load_models() -> None:
+    """Load every model now rather than on first use."""
+    for label in MODELS:
+        _load(label)
 
 
-def embed_texts(texts, model_name: str | None = None):
-    """Encode a list of texts into normalised embeddings."""
+def model_status() -> dict[str, str]:
+    """Model label -> "not loaded", "loading", "loaded" or "error: ..."."""
+    return dict(_status)
+
+
+def get_model(name: str | None = None) -> SentenceTransformer:
+    """Return the requested model or the default."""
+    key = name if name in MODELS else DEFAULT_MODEL
+    model = _loaded.get(key)
+    return model if model is not None else _load(key)
+
+
+# ── Batched encoding ────────────────────────────────────────────────────
+def _token_lengths(model: SentenceTransformer, texts: list[str]) -> list[int]:
+    """Tokens per text after truncation to the model's max sequence length."""
+    limit = getattr(model, "max_seq_length", None) or 512
+    try:
+        ids = model.tokenizer(texts, add_special_tokens=True, truncation=True, max_length=limit)["input_ids"]
+        return [len(i) for i in ids]
+    except Exception:
+        return [min(limit, len(t) // 4 + 2) for t in texts]
+
+
+def encode_batched(model: SentenceTransformer, texts: list[str]) -> np.ndarray:
+    """
+    Encode `texts` in length-sorted batches sized to a padded-token budget.
+
+    Texts are sorted longest first, and each batch holds as many as fit in
+    ENCODE_TOKEN_BUDGET padded tokens (capped at ENCODE_MAX_BATCH), so
+    short tail chunks are batched together instead of being padded to full
+    length, and peak memory stays bounded however large the upload.  The
+    budget shrinks when a batch takes longer than ENCODE_BATCH_SECONDS.
+    Results are returned in the original order.
+    """
+    n = len(texts)
+    out = np.empty((n, model.get_sentence_embedding_dimension()), dtype="float32")
+    if not n:
+        return out
+
+    start = time.perf_counter()
+    lengths = _token_lengths(model, texts)
+    order = sorted(range(n), key=lambda i: -lengths[i])
+    budget = ENCODE_TOKEN_BUDGET
+    i = 0
+    while i < n:
+        size = max(1, min(ENCODE_MAX_BATCH, budget // max(1, lengths[order[i]])))
+        batch = order[i:i + size]
+        batch_start = time.perf_counter()
+        out[batch] = model.encode([texts[j] for j in batch], batch_size=len(batch), normalize_embeddings=True)
+        elapsed = time.perf_counter() - batch_start
+        if ENCODE_BATCH_SECONDS and elapsed > ENCODE_BATCH_SECONDS:
+            tokens_per_s = sum(lengths[j] for j in batch) / elapsed
+            budget = max(512, int(tokens_per_s * ENCODE_BATCH_SECONDS))
+        i += size
+
+    elapsed = time.perf_counter() - start
+    log.log(
+        logging.INFO if n >= 64 else logging.DEBUG,
+        "Encoded %d texts in %.2fs (%.0f texts/s)", n, elapsed, n / elapsed if elapsed > 0 else float("inf"),
+    )
+    return out
+
+
+def embed_texts(texts, model_name: str | None = None, use_cache: bool = True):
+    """
+    Encode a list of texts into normalised embeddings.
+
+    Texts already in the embedding cache are not re-encoded, and each
+    distinct uncached text is encoded once per call.
+    """
     model = get_model(model_name)
-    return model.encode(texts, normalize_embeddings=True)
+    cache = get_cache() if use_cache else None
+    texts = list(texts)
+    if cache is None:
+        return encode_batched(model, texts)
+
+    model_id = MODELS[model_name if model_name in MODELS else DEFAULT_MODEL]
+    hashes = [text_hash(t) for t in texts]
+    vectors = cache.get_many(model_id, list(set(hashes)))
+    missing = {h: t for h, t in zip(hashes, texts) if h not in vectors}
+
+    hits = len(texts) - sum(1 for h in hashes if h in missing)
+    CACHE_HITS.inc(hits, "embedding")
+    CACHE_MISSES.inc(len(texts) - hits, "embedding")
+
+    if missing:
+        new = list(zip(missing.keys(), encode_batched(model, list(missing.values()))))
+        cache.put_many(model_id, new)
+        vectors.update(new)
+
+    out = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype="float32")
+    for i, h in enumerate(hashes):
+        out[i] = vectors[h]
+    return out
 
 
 def embed_query(query, model_name: str | None = None):
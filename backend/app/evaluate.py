@@ -0,0 +1,215 @@
+"""
+evaluate.py — Retrieval quality and speed evaluation.
+
+Runs the labelled questions from data/qa_input_examples.txt (labels in
+data/qa_input_labels.json: question -> documents that answer it)
+against every combination of chunker, embedding model, index type and
+reranker, and reports recall@k, MRR and query latency side by side.
+With --min-recall the fastest configuration meeting that bar is
+highlighted.
+
+Labels are at document level, so they stay valid across chunkers.
+Everything is deterministic and runs offline once the models are
+cached; results can be written as JSON for comparison across runs.
+
+Usage (from backend/):
+    python -m app.evaluate --models MiniLM-L6 MPNet-Base --chunkers 500/50 300/30
+    python -m app.evaluate --rerankers none hybrid --min-recall 0.9 --output eval.json
+"""
+
+import os
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import re
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from app.benchmark import INDEX_TYPES, DATA_DIR, environment, summarize
+from app.chunking import chunk_pages
+from app.embeddings import embed_texts, embed_query, get_dimension, MODELS, DEFAULT_MODEL
+from app.ingest import iter_document_paths, load_questions, read_pages
+
+log = logging.getLogger(__name__)
+
+LABELS_FILE = DATA_DIR / "qa_input_labels.json"
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# ── Rerankers ───────────────────────────────────────────────────────────
+# Each takes (question, candidates) and returns the candidates reordered.
+def _hybrid(question: str, candidates: list[dict], alpha: float = 0.7) -> list[dict]:
+    """Blend cosine score with the fraction of question terms in the chunk."""
+    terms = set(_WORD.findall(question.lower()))
+    if not terms:
+        return candidates
+
+    def score(c: dict) -> float:
+        overlap = len(terms & set(_WORD.findall(c["text"].lower()))) / len(terms)
+        return alpha * c["score"] + (1 - alpha) * overlap
+
+    return sorted(candidates, key=score, reverse=True)
+
+
+RERANKERS = {
+    "none": None,
+    "hybrid": _hybrid,
+}
+
+
+# ── Inputs ──────────────────────────────────────────────────────────────
+def load_labelled_questions() -> list[tuple[str, set[str]]]:
+    """Pair each question with its labelled sources; unlabelled ones are skipped."""
+    labels = json.loads(LABELS_FILE.read_text(encoding="utf-8"))
+    pairs = []
+    for q in load_questions():
+        if q in labels:
+            pairs.append((q, set(labels[q])))
+        else:
+            log.warning("No label for question: %s", q)
+    return pairs
+
+
+def parse_chunker(spec: str) -> tuple[int, int]:
+    """'500/50' -> (size=500, overlap=50)."""
+    size, _, overlap = spec.partition("/")
+    return int(size), int(overlap or 0)
+
+
+def chunk_corpus(size: int, overlap: int):
+    chunks, sources = [], []
+    for path in iter_document_paths(str(DATA_DIR)):
+        name = os.path.basename(path)
+        for chunk, _ in chunk_pages(read_pages(path), size, overlap):
+            chunks.append(chunk)
+            sources.append(name)
+    return chunks, sources
+
+
+# ── Scoring ─────────────────────────────────────────────────────────────
+def score_run(ranked_sources: list[list[str]], relevant: list[set[str]], k: int) -> dict:
+    """recall@k, hit@k and MRR over document-level labels."""
+    recalls, hits, rr = [], [], []
+    for ranked, rel in zip(ranked_sources, relevant):
+        top = ranked[:k]
+        recalls.append(len(rel & set(top)) / len(rel))
+        hits.append(1.0 if rel & set(top) else 0.0)
+        rank = next((i + 1 for i, s in enumerate(ranked) if s in rel), None)
+        rr.append(1.0 / rank if rank else 0.0)
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        f"hit@{k}": round(float(np.mean(hits)), 4),
+        "mrr": round(float(np.mean(rr)), 4),
+    }
+
+
+def evaluate_config(store, questions, model: str, reranker, k: int, fetch_k: int, repeats: int):
+    ranked_sources, latencies = [], []
+    for question, _ in questions:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            candidates = store.search(embed_query(question, model), top_k=fetch_k)
+            if reranker is not None:
+                candidates = reranker(question, candidates)
+            latencies.append(time.perf_counter() - start)
+        ranked_sources.append([c["source"] for c in candidates[:k]])
+    quality = score_run(ranked_sources, [rel for _, rel in questions], k)
+    return quality, summarize(latencies, len(latencies), "queries")
+
+
+def run(args) -> list[dict]:
+    questions = load_labelled_questions()
+    results = []
+    for spec in args.chunkers:
+        size, overlap = parse_chunker(spec)
+        chunks, sources = chunk_corpus(size, overlap)
+        for model in args.models:
+            embeddings = np.asarray(embed_texts(chunks, model, use_cache=False), dtype="float32")
+            for index_type in args.indexes:
+                # Train on the (small) corpus itself; a store that still
+                # cannot train — PCA needs at least REDUCE_DIM vectors —
+                # searches exactly and is reported as untrained.
+                store = INDEX_TYPES[index_type](get_dimension(model), train_min=0)
+                store.add(embeddings, chunks, sources)
+                if not store.trained:
+                    log.warning("%s could not be trained on %d chunks; it is measured as exact search",
+                                index_type, len(chunks))
+                for rerank in args.rerankers:
+                    reranker = RERANKERS[rerank]
+                    # Rerankers need a wider candidate pool to reorder.
+                    fetch_k = args.k * args.fetch_factor if reranker else args.k
+                    quality, latency = evaluate_config(
+                        store, questions, model, reranker, args.k, fetch_k, args.repeats
+                    )
+                    results.append({
+                        "chunker": spec,
+                        "model": model,
+                        "index": index_type,
+                        "rerank": rerank,
+                        "chunks": len(chunks),
+                        "trained": store.trained,
+                        "quality": quality,
+                        "latency": latency,
+                    })
+    return results
+
+
+# ── Reporting ───────────────────────────────────────────────────────────
+def pick_fastest(results: list[dict], k: int, min_recall: float) -> dict | None:
+    passing = [r for r in results if r["trained"] and r["quality"][f"recall@{k}"] >= min_recall]
+    return min(passing, key=lambda r: r["latency"]["p50_ms"], default=None)
+
+
+def print_table(results: list[dict], k: int, best: dict | None) -> None:
+    header = (
+        f"  {'chunker':<8} {'model':<11} {'index':<10} {'rerank':<7} {'chunks':>6} "
+        f"{f'recall@{k}':>9} {f'hit@{k}':>6} {'mrr':>6} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+    print(header)
+    print("─" * len(header))
+    for r in results:
+        q, lat = r["quality"], r["latency"]
+        mark = "*" if r is best else " "
+        print(
+            f"{mark} {r['chunker']:<8} {r['model']:<11} {r['index']:<10} {r['rerank']:<7} {r['chunks']:>6} "
+            f"{q[f'recall@{k}']:>9.3f} {q[f'hit@{k}']:>6.3f} {q['mrr']:>6.3f} "
+            f"{lat['p50_ms']:>8.3f} {lat['p95_ms']:>8.3f}"
+            + ("  untrained (exact search)" if not r["trained"] else "")
+        )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and speed per configuration.")
+    parser.add_argument("--chunkers", nargs="+", default=["500/50"], help="size/overlap pairs")
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL], choices=list(MODELS))
+    parser.add_argument("--indexes", nargs="+", default=["flat"], choices=list(INDEX_TYPES))
+    parser.add_argument("--rerankers", nargs="+", default=["none"], choices=list(RERANKERS))
+    parser.add_argument("-k", type=int, default=3, help="Cut-off for recall@k")
+    parser.add_argument("--fetch-factor", type=int, default=4, help="Candidate pool multiplier for rerankers")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per question")
+    parser.add_argument("--min-recall", type=float, help="Highlight the fastest config meeting this recall@k")
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args)
+    best = pick_fastest(results, args.k, args.min_recall) if args.min_recall is not None else None
+    print_table(results, args.k, best)
+    if args.min_recall is not None:
+        print(f"\n* fastest with recall@{args.k} ≥ {args.min_recall}" if best else
+              f"\nNo configuration reaches recall@{args.k} ≥ {args.min_recall}")
+
+    if args.output:
+        report = {"environment": environment(), "args": {k: str(v) for k, v in vars(args).items()}, "results": results}
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
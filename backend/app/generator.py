@@ -5,9 +5,19 @@ Combines the top-k retrieved chunks into a structured, human-readable
 answer with source attribution.  No external LLM is required — the
 answer is composed directly from the document text, ensuring zero
 hallucination and full traceability.
+
+Two modes are available:
+  • chunks     — whole retrieved chunks grouped by source (default)
+  • extractive — only the sentences closest to the query, scored in one
+                 batched matrix product and packed into a token budget
 """
 
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Iterator
+
+import numpy as np
+
+from app.embeddings import embed_texts
 
 
 def _clean_chunk(text: str) -> str:
@@ -41,9 +51,9 @@ def _deduplicate_chunks(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return unique
 
 
-def generate_answer(results: List[Dict[str, Any]]) -> str:
+def iter_answer(results: List[Dict[str, Any]]) -> Iterator[str]:
     """
-    Synthesise a structured answer from retrieved chunks.
+    Synthesise a structured answer from retrieved chunks, piece by piece.
 
     Strategy:
       1. Deduplicate chunks (overlap from the sliding-window chunker).
@@ -51,9 +61,14 @@ def generate_answer(results: List[Dict[str, Any]]) -> str:
       3. Present each source's content clearly with attribution.
       4. If only one chunk survives dedup, return it directly with
          a brief header.
+
+    Yields the summary header (if any) and then one section per source
+    group, separators included, so "".join() gives the full answer and
+    a streaming client can render each group as soon as it is composed.
     """
     if not results:
-        return "No relevant information found in the indexed documents."
+        yield "No relevant information found in the indexed documents."
+        return
 
     unique = _deduplicate_chunks(results)
 
@@ -61,29 +76,122 @@ def generate_answer(results: List[Dict[str, Any]]) -> str:
     if len(unique) == 1:
         chunk = unique[0]
         body = _clean_chunk(chunk["text"])
-        return (
+        yield (
             f"Based on **{chunk['source']}**:\n\n"
             f"{body}"
         )
+        return
 
     # ── Multi-chunk: group by source ────────────────────────────────
+    # Grouping only needs the raw chunks; cleaning happens per group
+    # as each section is emitted.
     groups: dict[str, list[str]] = {}
     for r in unique:
-        groups.setdefault(r["source"], []).append(_clean_chunk(r["text"]))
-
-    parts: list[str] = []
-    for source, chunks in groups.items():
-        combined = "\n\n".join(chunks)
-        parts.append(f"**From {source}:**\n{combined}")
-
-    answer = "\n\n---\n\n".join(parts)
+        groups.setdefault(r["source"], []).append(r["text"])
 
     # Add a brief summary header when multiple sources contributed
     if len(groups) > 1:
         source_list = ", ".join(f"*{s}*" for s in groups)
-        answer = (
+        yield (
             f"Information compiled from {len(groups)} documents "
-            f"({source_list}):\n\n{answer}"
+            f"({source_list}):\n\n"
         )
 
-    return answer
+    for i, (source, chunks) in enumerate(groups.items()):
+        combined = "\n\n".join(_clean_chunk(c) for c in chunks)
+        separator = "\n\n---\n\n" if i else ""
+        yield f"{separator}**From {source}:**\n{combined}"
+
+
+def generate_answer(results: List[Dict[str, Any]]) -> str:
+    """Synthesise the full answer in one string (see iter_answer)."""
+    return "".join(iter_answer(results))
+
+
+# ── Extractive mode ─────────────────────────────────────────────────────
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+_MIN_SENTENCE_WORDS = 4
+
+
+def _approx_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def _split_sentences(text: str) -> list[str]:
+    """Split a chunk into sentences / lines, dropping short fragments."""
+    sentences = []
+    for part in _SENTENCE_BOUNDARY.split(text):
+        part = " ".join(part.split()).lstrip("-•*+ ")
+        if len(part.split()) >= _MIN_SENTENCE_WORDS:
+            sentences.append(part)
+    return sentences
+
+
+def iter_extractive_answer(
+    results: List[Dict[str, Any]],
+    query_vec,
+    max_tokens: int = 512,
+) -> Iterator[str]:
+    """
+    Yield an answer built from the best-matching sentences only.
+
+    Every sentence of the retrieved chunks is embedded in a single batch
+    and scored against the already-computed query embedding with one
+    matrix-vector product.  Sentences are taken best-first while they fit
+    in `max_tokens`, then re-grouped by source in reading order.  Yields
+    the header and one section per source, like iter_answer.
+    """
+    if not results:
+        yield "No relevant information found in the indexed documents."
+        return
+
+    # (chunk rank, position in chunk, source, sentence) — overlapping
+    # windows repeat sentences, so keep the first occurrence only.
+    candidates: list[tuple[int, int, str, str]] = []
+    seen: set[str] = set()
+    for rank, r in enumerate(_deduplicate_chunks(results)):
+        for pos, sentence in enumerate(_split_sentences(r["text"])):
+            key = sentence.lower()
+            if key not in seen:
+                seen.add(key)
+                candidates.append((rank, pos, r["source"], sentence))
+
+    if not candidates:
+        yield from iter_answer(results)
+        return
+
+    # Query-time sentences are not worth persisting: skip the chunk cache.
+    vectors = np.asarray(embed_texts([c[3] for c in candidates], use_cache=False), dtype="float32")
+    scores = vectors @ np.asarray(query_vec, dtype="float32").reshape(-1)
+
+    budget = max_tokens
+    chosen: list[tuple[int, int, str, str]] = []
+    for i in np.argsort(-scores):
+        cost = _approx_tokens(candidates[i][3])
+        if cost <= budget:
+            chosen.append(candidates[i])
+            budget -= cost
+    if not chosen:
+        # The single best sentence alone exceeds the budget — truncate it.
+        rank, pos, source, sentence = candidates[int(np.argmax(scores))]
+        chosen = [(rank, pos, source, sentence[: max_tokens * 4])]
+
+    groups: dict[str, list[str]] = {}
+    for _, _, source, sentence in sorted(chosen):
+        groups.setdefault(source, []).append(sentence)
+
+    if len(groups) == 1:
+        source, sentences = next(iter(groups.items()))
+        yield f"Based on **{source}**:\n\n" + "\n".join(f"- {s}" for s in sentences)
+        return
+
+    source_list = ", ".join(f"*{s}*" for s in groups)
+    yield (
+        f"Information compiled from {len(groups)} documents "
+        f"({source_list}):\n\n"
+    )
+    for i, (source, sentences) in enumerate(groups.items()):
+        separator = "\n\n---\n\n" if i else ""
+        bullets = "\n".join(f"- {s}" for s in sentences)
+        yield f"{separator}**From {source}:**\n{bullets}"
@@ -0,0 +1,120 @@
+"""
+health.py — Background startup, warm-up and liveness/readiness probes.
+
+The server starts answering HTTP immediately; `Startup` then loads the
+embedding models, loads (or builds) the default collection's index and
+runs a few warm-up queries through retrieval and answer generation, so
+the first real request does not pay for cold caches.
+
+  GET /health/live   200 while the process is healthy, 503 if startup failed
+  GET /health/ready  200 once warm-up has finished, 503 before that;
+                     both report phase, model status, index size,
+                     indexing progress and index_complete
+
+Orchestrators should route traffic on /health/ready and restart on
+/health/live, so a rolling deploy only shifts traffic to warm replicas.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.collection import CollectionManager, DEFAULT_COLLECTION
+from app.embeddings import load_models, model_status
+from app.generator import iter_answer
+from app.ingest import QUESTIONS_FILE, load_questions
+from app.metrics import unrecorded
+from app.retriever import retrieve
+
+log = logging.getLogger(__name__)
+
+WARMUP_QUERIES = int(os.getenv("WARMUP_QUERIES", "3"))
+
+
+def warmup_questions(limit: int = WARMUP_QUERIES) -> list[str]:
+    """The first `limit` example questions, or a placeholder if there are none."""
+    if limit <= 0:
+        return []
+    questions = load_questions() if QUESTIONS_FILE.is_file() else []
+    return questions[:limit] or ["warm-up"]
+
+
+class Startup:
+    """Phases: starting → loading_models → indexing → warming_up → ready (or failed)."""
+
+    def __init__(self, collections: CollectionManager):
+        self.collections = collections
+        self.phase = "starting"
+        self.error: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.ready_after: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    def _warm_up(self) -> None:
+        vector_store = self.collections.get(DEFAULT_COLLECTION).vector_store
+        # Not traffic: keep warm-up latencies out of the stage histogram.
+        with unrecorded():
+            for question in warmup_questions():
+                "".join(iter_answer(retrieve(question, vector_store)))
+
+    def run(self) -> None:
+        try:
+            self.phase = "loading_models"
+            load_models()
+            self.phase = "indexing"
+            # Queries are already served from the partial index; readiness
+            # waits until every document has been ingested.
+            self.collections.get(DEFAULT_COLLECTION).indexed.wait()
+            self.phase = "warming_up"
+            self._warm_up()
+        except Exception as e:
+            self.phase = "failed"
+            self.error = str(e)
+            log.exception("Startup failed")
+            return
+        self.ready_after = time.monotonic() - self.started_at
+        self.phase = "ready"
+        log.info("Ready after %.1fs", self.ready_after)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run, name="startup", daemon=True)
+        self._thread.start()
+
+    def status(self) -> dict:
+        collection = next((c for c in self.collections.loaded() if c.name == DEFAULT_COLLECTION), None)
+        indexer = self.collections.loading.get(DEFAULT_COLLECTION) or (collection and collection.indexer)
+        return {
+            "status": self.phase,
+            "error": self.error,
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "ready_after_s": round(self.ready_after, 1) if self.ready_after is not None else None,
+            "models": model_status(),
+            "index_size": collection.vector_store.ntotal if collection else 0,
+            "documents": len(collection.vector_store.documents()) if collection else 0,
+            "index_complete": bool(collection and collection.index_complete),
+            "progress": dict(indexer.progress) if indexer else None,
+        }
+
+
+def create_health_routes(startup: Startup) -> APIRouter:
+    router = APIRouter(prefix="/health")
+
+    @router.get("/live")
+    def live():
+        body = {"status": "failed" if startup.phase == "failed" else "alive", "error": startup.error}
+        return JSONResponse(body, status_code=503 if startup.phase == "failed" else 200)
+
+    @router.get("/ready")
+    def ready():
+        return JSONResponse(startup.status(), status_code=200 if startup.ready else 503)
+
+    return router
@@ -0,0 +1,225 @@
+"""
+indexer.py — Keeps the vector store in sync with files on disk.
+
+Every path that changes the index (startup ingestion, uploads and the
+data-directory watcher) goes through one Indexer, which serialises
+ingestion and remembers the (mtime, size) signature of each file it
+indexed.  Re-indexing a file whose signature has not changed is a
+no-op, so an upload followed by the watcher noticing the same file
+does not embed it twice.
+
+Each indexed document is recorded in the metadata store with its
+content hash, embedding model and chunker.  On restart `restore()`
+rebuilds the FAISS index from the stored chunk text, and
+`index_folder()` only re-reads files whose hash, model or chunker
+changed.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from app.chunking import chunk_pages, CHUNKER_ID
+from app.embeddings import embed_texts, MODELS, DEFAULT_MODEL
+from app.ingest import read_pages, iter_document_paths, SUPPORTED_EXTENSIONS, EXCLUDED_FILES
+from app.metrics import CACHE_HITS, CACHE_MISSES, CHUNKS_INDEXED, span
+
+log = logging.getLogger(__name__)
+
+MODEL_ID = MODELS[DEFAULT_MODEL]
+
+
+def is_indexable(name: str) -> bool:
+    """True for supported, non-excluded, non-hidden file names."""
+    return (
+        Path(name).suffix.lower() in SUPPORTED_EXTENSIONS
+        and name not in EXCLUDED_FILES
+        and not name.startswith(".")
+    )
+
+
+def extract_chunks(path) -> list[tuple[str, Optional[int]]]:
+    """Read and chunk a file, returning (chunk, page) pairs."""
+    return list(chunk_pages(read_pages(str(path))))
+
+
+def content_hash(path) -> Optional[str]:
+    """sha256 of a file's bytes, or None if it has gone."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _signature(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class Indexer:
+    def __init__(self, vector_store, data_dir):
+        self.vector_store = vector_store
+        self.data_dir = Path(data_dir)
+        self._signatures: dict[str, tuple[int, int]] = {}
+        self._restored: set[str] = set()
+        self._lock = threading.Lock()
+        # Startup progress, reported by /health/ready.
+        self.progress = {"chunks_restored": 0, "files_total": 0, "files_done": 0}
+
+    def index_chunks(self, name: str, paged: list[tuple[str, Optional[int]]], path=None) -> int:
+        """Embed pre-extracted chunks and (re)place them under `name`."""
+        chunks = [chunk for chunk, _ in paged]
+        pages = [page for _, page in paged]
+        with span("embed_chunks"):
+            embeddings = embed_texts(chunks) if chunks else None
+        with self._lock:
+            self.vector_store.replace_source(
+                name, embeddings, chunks, pages,
+                content_hash=content_hash(path) if path is not None else None,
+                model=MODEL_ID,
+                chunker=CHUNKER_ID,
+            )
+            sig = _signature(Path(path)) if path is not None else None
+            if sig is not None:
+                self._signatures[name] = sig
+        CHUNKS_INDEXED.inc(len(chunks))
+        return len(chunks)
+
+    def is_current(self, path: Path) -> bool:
+        """True if `path` was restored from the store and is unchanged."""
+        name = path.name
+        if name not in self._restored:
+            return False
+        doc = self.vector_store.metadata_store.document(name)
+        return (
+            doc is not None
+            and doc["model"] == MODEL_ID
+            and doc["chunker"] == CHUNKER_ID
+            and doc["content_hash"] == content_hash(path)
+        )
+
+    def index_path(self, path, force: bool = False) -> Optional[int]:
+        """
+        Index (or re-index) one file.
+
+        Returns the number of chunks now indexed for it, or None when the
+        file is unchanged since it was last indexed.  Extraction errors
+        propagate to the caller.
+        """
+        path = Path(path)
+        name = path.name
+        sig = _signature(path)
+        if not force and sig is not None and self._signatures.get(name) == sig:
+            return None
+        if not force and self.is_current(path):
+            self._signatures[name] = sig
+            return None
+        with span("extract"):
+            paged = extract_chunks(path)
+        count = self.index_chunks(name, paged, path)
+        log.info("Indexed %s (%d chunks)", name, count)
+        return count
+
+    def remove(self, name: str) -> int:
+        """Remove a document from the index. Returns chunks removed."""
+        with self._lock:
+            self._signatures.pop(name, None)
+            self._restored.discard(name)
+            removed = self.vector_store.remove_source(name)
+        if removed:
+            log.info("Removed %s (%d chunks)", name, removed)
+        return removed
+
+    def restore(self) -> int:
+        """
+        Rebuild the FAISS index from chunks in the metadata store.
+
+        Only chunks embedded with the current model are restored; other
+        documents are left for index_folder() to re-index.  Returns the
+        number of chunks restored.
+        """
+        store = self.vector_store.metadata_store
+        total = 0
+        for rows in store.iter_chunks():
+            rows = [r for r in rows if r["model"] == MODEL_ID]
+            if not rows:
+                continue
+            with span("embed_chunks"):
+                embeddings = embed_texts([r["text"] for r in rows])
+            self.vector_store.attach([r["id"] for r in rows], embeddings, [r["name"] for r in rows])
+            self._restored.update(r["name"] for r in rows)
+            total += len(rows)
+            self.progress["chunks_restored"] = total
+        if total:
+            log.info("Restored %d chunks from %s", total, store.path)
+        return total
+
+    def adopt(self) -> int:
+        """
+        Treat stored documents as restored without re-embedding them, for
+        when their vectors were loaded from an index snapshot.  Returns
+        the number of chunks adopted.
+        """
+        docs = [d for d in self.vector_store.metadata_store.documents() if d["model"] == MODEL_ID]
+        self._restored.update(d["name"] for d in docs)
+        self.progress["chunks_restored"] = sum(d["chunk_count"] for d in docs)
+        return self.progress["chunks_restored"]
+
+    def index_folder(self, priority: Optional[dict[str, int]] = None) -> int:
+        """
+        Index every supported file in the data directory and drop
+        documents whose file no longer exists.
+
+        Files are indexed one at a time, each searchable as soon as it is
+        done.  With `priority` (document name -> query hits) the most
+        queried files go first; ties are broken smallest file first.
+        """
+        total = 0
+        present = set()
+        hits_before = CACHE_HITS.value("embedding")
+        misses_before = CACHE_MISSES.value("embedding")
+        paths = list(iter_document_paths(str(self.data_dir)))
+        if priority is not None:
+            paths.sort(key=lambda p: (-priority.get(os.path.basename(p), 0), _size(p)))
+        self.progress.update(files_total=len(paths), files_done=0)
+        for path in paths:
+            name = os.path.basename(path)
+            present.add(name)
+            try:
+                count = self.index_path(path)
+            except Exception as e:
+                log.error("Failed to load %s: %s", name, e)
+                continue
+            finally:
+                self.progress["files_done"] += 1
+            if count == 0:
+                log.warning("Skipped empty file: %s", name)
+            total += count or 0
+        # Uploads can add documents while this runs, so only drop names
+        # whose file is really gone now, not merely missing from `paths`.
+        for name in set(self.vector_store.documents()) - present:
+            if not (self.data_dir / name).exists():
+                self.remove(name)
+
+        hits = CACHE_HITS.value("embedding") - hits_before
+        embedded = hits + CACHE_MISSES.value("embedding") - misses_before
+        if embedded:
+            log.info("Embedding cache: %d of %d chunks reused (%.0f%%)", hits, embedded, 100 * hits / embedded)
+        return total
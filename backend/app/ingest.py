@@ -4,31 +4,103 @@ ingest.py — Document loader for the RAG pipeline.
 Supports .txt, .pdf and .docx files. Documents are read from the
 specified folder at startup and can also be uploaded at runtime
 via the /documents/upload endpoint.
+
+PDFs are extracted page by page.  Large PDFs are split into page
+ranges that are parsed in a process pool, and pages are yielded in
+order as soon as their range finishes, so the chunker can start
+working before the whole document has been extracted.
 """
 
 import os
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator, Optional, Tuple
 
 log = logging.getLogger(__name__)
 
 EXCLUDED_FILES = {"qa_input_examples.txt"}
+QUESTIONS_FILE = Path(__file__).resolve().parents[1] / "data" / "qa_input_examples.txt"
 SUPPORTED_EXTENSIONS = {".txt", ".pdf", ".docx"}
 
+# ── PDF parallelism (env-configurable) ─────────────────────────────────────
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count() or 1
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+# (page number, text) — page is None for formats without pagination
+Page = Tuple[Optional[int], str]
+
 
 def _read_txt(path: str) -> str:
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
 
-def _read_pdf(path: str) -> str:
+def _extract_page(page, number: int, path: str) -> str:
+    """Extract one page, logging and returning "" if pypdf chokes on it."""
+    try:
+        return page.extract_text() or ""
+    except Exception as e:
+        log.warning("Failed to extract page %d of %s: %s", number, path, e)
+        return ""
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[Page]:
+    """Process-pool worker: extract pages [start, stop) of a PDF."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [
+        (i + 1, _extract_page(reader.pages[i], i + 1, path))
+        for i in range(start, stop)
+    ]
+
+
+def iter_pdf_pages(path: str) -> Iterator[Page]:
+    """
+    Yield (page_number, text) for every page of a PDF, in order.
+
+    Small PDFs are parsed in-process.  PDFs with at least
+    PDF_PARALLEL_MIN_PAGES pages are split into ranges and fanned out
+    to a process pool; a failed range is retried serially so one bad
+    page never loses the whole document.
+    """
     try:
         from pypdf import PdfReader
     except ImportError:
         log.warning("pypdf not installed — skipping %s", path)
-        return ""
+        return
+
     reader = PdfReader(path)
-    pages = [page.extract_text() or "" for page in reader.pages]
+    n_pages = len(reader.pages)
+    workers = min(PDF_WORKERS, n_pages)
+
+    if n_pages < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        for i, page in enumerate(reader.pages):
+            yield i + 1, _extract_page(page, i + 1, path)
+        return
+
+    # Several ranges per worker keeps the pool busy when page cost varies.
+    step = max(1, -(-n_pages // (workers * 4)))
+    ranges = [(s, min(s + step, n_pages)) for s in range(0, n_pages, step)]
+
+    # "spawn" rather than fork: the parent has torch/FAISS thread pools
+    # running, and forking those is a known source of deadlocks.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [pool.submit(_extract_page_range, path, s, e) for s, e in ranges]
+        for (start, stop), future in zip(ranges, futures):
+            try:
+                yield from future.result()
+            except Exception as e:
+                log.warning("Worker failed on pages %d-%d of %s: %s", start + 1, stop, path, e)
+                for i in range(start, stop):
+                    yield i + 1, _extract_page(reader.pages[i], i + 1, path)
+
+
+def _read_pdf(path: str) -> str:
+    pages = [text for _, text in iter_pdf_pages(path)]
     return "\n\n".join(pages).strip()
 
 
@@ -53,18 +125,31 @@ def read_file(path: str) -> str:
         return _read_txt(path)
 
 
-def load_documents(folder_path: str):
-    """Load all supported documents from a folder."""
-    documents = []
+def read_pages(path: str) -> Iterator[Page]:
+    """Stream a file as (page_number, text) pairs — one pair for non-PDFs."""
+    if Path(path).suffix.lower() == ".pdf":
+        yield from iter_pdf_pages(path)
+    else:
+        yield None, read_file(path)
 
-    for file in os.listdir(folder_path):
+
+def iter_document_paths(folder_path: str) -> Iterator[str]:
+    """Yield the paths of all ingestible files in a folder."""
+    for file in sorted(os.listdir(folder_path)):
         ext = Path(file).suffix.lower()
         if ext not in SUPPORTED_EXTENSIONS:
             continue
         if file in EXCLUDED_FILES:
             continue
+        yield os.path.join(folder_path, file)
+
 
-        filepath = os.path.join(folder_path, file)
+def load_documents(folder_path: str):
+    """Load all supported documents from a folder."""
+    documents = []
+
+    for filepath in iter_document_paths(folder_path):
+        file = os.path.basename(filepath)
         try:
             text = read_file(filepath)
             if text.strip():
@@ -76,3 +161,14 @@ def load_documents(folder_path: str):
             log.error("Failed to load %s: %s", file, e)
 
     return documents
+
+
+def load_questions(path: Path = QUESTIONS_FILE) -> list[str]:
+    """Read the quoted example questions from qa_input_examples.txt."""
+    questions = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        questions.append(line.strip('"'))
+    return questions
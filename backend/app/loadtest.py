@@ -0,0 +1,332 @@
+"""
+loadtest.py — In-process load test simulating concurrent recruiters.
+
+Drives the real FastAPI app (startup, collections, threadpool and all)
+through httpx's ASGI transport, so no server or network is needed.  For
+each concurrency level in --users, that many simulated recruiters run for
+--duration seconds.  Each recruiter loops:
+
+  • ask     — POST /ask-recruiter with a question from the mix
+              (data/qa_input_examples.txt, or --questions FILE)
+  • upload  — with probability --upload-ratio, POST /documents/upload
+              of a synthetic document to a scratch "loadtest-<id>"
+              collection instead, so indexing competes with queries
+  • think   — sleep an exponentially distributed --think seconds
+
+and every level reports throughput, latency percentiles per request
+kind, error rate and process CPU / RSS (sampled every --sample-seconds;
+the full timeline is kept in the JSON output).  With --slo-p99-ms the
+highest level whose ask p99 meets the SLO is reported, and
+--require-users makes the run exit non-zero below that level — usable
+as a pre-deploy check.  --compare shows the p99 change against a
+previous --output file.
+
+The run never touches real state: the app gets a fresh temporary
+COLLECTIONS_DIR (default collection, saved indexes, query statistics and
+embedding cache), deleted afterwards, so the default collection is
+indexed from DATA_DIR at startup.  --collections-dir runs against an
+existing directory instead; only the scratch collection is deleted from
+it.  Every uploaded document carries a unique token in each chunk-sized
+window, so upload latency always includes embedding rather than
+embedding-cache hits.  Needs httpx.
+
+Usage (from backend/):
+    python -m app.loadtest --users 1 4 16 --duration 30 --slo-p99-ms 800
+    python -m app.loadtest --users 8 --think 2 --upload-ratio 0.05 --output load.json
+    python -m app.loadtest --users 1 4 16 --compare load.json --require-users 4
+"""
+
+import os
+
+# Never reach out to the Hugging Face Hub from a load test.
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import json
+import time
+import uuid
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import importlib.util
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+import tempfile
+
+import numpy as np
+
+from app.chunking import CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+# Unique per run, so deleting it afterwards never touches a real tenant.
+SCRATCH_COLLECTION = f"loadtest-{uuid.uuid4().hex[:12]}"
+KINDS = ("ask", "upload")
+
+# Salt spacing for uploads: any chunk overlaps at least one token.
+SALT_EVERY = CHUNK_SIZE // 2
+
+
+# ── Resource sampling ───────────────────────────────────────────────────
+def rss_mb() -> Optional[float]:
+    """Resident set size of this process, from /proc (None elsewhere)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def sample_resources(samples: list[dict], interval: float, stop: asyncio.Event) -> None:
+    """Append {t, cpu_percent, rss_mb} every `interval` seconds until `stop`."""
+    start = last_wall = time.perf_counter()
+    last_cpu = time.process_time()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        wall, cpu = time.perf_counter(), time.process_time()
+        if wall - last_wall <= 0:
+            continue
+        # Process CPU time across all threads; >100% uses several cores.
+        samples.append({
+            "t": round(wall - start, 2),
+            "cpu_percent": round(100.0 * (cpu - last_cpu) / (wall - last_wall), 1),
+            "rss_mb": rss_mb(),
+        })
+        last_wall, last_cpu = wall, cpu
+
+
+# ── Simulated recruiters ────────────────────────────────────────────────
+def unique_text(text: str) -> str:
+    """`text` with a fresh token every SALT_EVERY characters, so no chunk
+    of it is already in the embedding cache."""
+    return "".join(
+        f"[ref {uuid.uuid4().hex}] {text[i:i + SALT_EVERY]}"
+        for i in range(0, len(text), SALT_EVERY)
+    )
+
+
+async def recruiter(client, deadline: float, rng: random.Random, questions, documents, args, headers, records) -> None:
+    while time.perf_counter() < deadline:
+        if documents and rng.random() < args.upload_ratio:
+            kind = "upload"
+            text = unique_text(rng.choice(documents)["text"])
+            call = client.post(
+                "/documents/upload",
+                params={"collection": SCRATCH_COLLECTION},
+                files={"files": (f"load_{uuid.uuid4().hex[:12]}.txt", text.encode("utf-8"), "text/plain")},
+                headers=headers,
+            )
+        else:
+            kind = "ask"
+            call = client.post(
+                "/ask-recruiter",
+                json={"question": rng.choice(questions), "top_k": args.top_k},
+                headers=headers,
+            )
+        start = time.perf_counter()
+        try:
+            response = await call
+            error = str(response.status_code) if response.status_code >= 400 else None
+        except Exception as e:
+            error = type(e).__name__
+        records.append((kind, time.perf_counter() - start, error))
+        if args.think > 0:
+            await asyncio.sleep(rng.expovariate(1.0 / args.think))
+
+
+def summarize_stage(users: int, records: list, elapsed: float, samples: list[dict]) -> dict:
+    errors = Counter(error for _, _, error in records if error)
+    stats = {
+        "users": users,
+        "requests": len(records),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(len(records) / elapsed, 2) if elapsed > 0 else None,
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        "errors": dict(errors),
+    }
+    for kind in KINDS:
+        ms = np.array([d for k, d, _ in records if k == kind]) * 1000.0
+        if len(ms):
+            stats[kind] = {
+                "calls": len(ms),
+                "p50_ms": round(float(np.percentile(ms, 50)), 1),
+                "p95_ms": round(float(np.percentile(ms, 95)), 1),
+                "p99_ms": round(float(np.percentile(ms, 99)), 1),
+                "max_ms": round(float(ms.max()), 1),
+            }
+    cpu = [s["cpu_percent"] for s in samples]
+    rss = [s["rss_mb"] for s in samples if s["rss_mb"] is not None]
+    stats.update(
+        cpu_percent_mean=round(float(np.mean(cpu)), 1) if cpu else None,
+        cpu_percent_max=round(max(cpu), 1) if cpu else None,
+        rss_mb_max=round(max(rss), 1) if rss else None,
+        timeline=samples,
+    )
+    return stats
+
+
+async def run_stage(client, users: int, args, questions, documents, headers) -> dict:
+    records: list = []
+    samples: list[dict] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_resources(samples, args.sample_seconds, stop))
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        recruiter(client, deadline, random.Random(args.seed * 1000 + i), questions, documents, args, headers, records)
+        for i in range(users)
+    ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+    return summarize_stage(users, records, elapsed, samples)
+
+
+async def wait_ready(client, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/health/ready")
+        if response.status_code == 200:
+            return
+        if response.json().get("status") == "failed" or time.perf_counter() > deadline:
+            raise RuntimeError(f"Server not ready: {response.json()}")
+        await asyncio.sleep(0.5)
+
+
+async def run(args, questions: list[str], documents: list[dict]) -> list[dict]:
+    import httpx
+
+    # Imported here so command-line settings (e.g. --collections-dir)
+    # are in the environment before the app reads its configuration.
+    from app.main import app, collections
+
+    docs_api_key = os.getenv("DOCS_API_KEY", "").strip()
+    headers = {"X-API-Key": docs_api_key} if docs_api_key else {}
+    results = []
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+                start = time.perf_counter()
+                await wait_ready(client, args.ready_timeout)
+                print(f"Ready after {time.perf_counter() - start:.1f}s")
+                for users in args.users:
+                    stats = await run_stage(client, users, args, questions, documents, headers)
+                    log.info("%d users: %s", users, {k: v for k, v in stats.items() if k != "timeline"})
+                    results.append(stats)
+    finally:
+        shutil.rmtree(collections.storage_dir(SCRATCH_COLLECTION), ignore_errors=True)
+    return results
+
+
+# ── Report ──────────────────────────────────────────────────────────────
+def print_table(results: list[dict], baseline: list[dict] | None = None) -> None:
+    previous = {r["users"]: r.get("ask", {}).get("p99_ms") for r in baseline or []}
+    header = (
+        f"{'users':>5} {'req/s':>8} {'ask p50':>8} {'ask p95':>8} {'ask p99':>8} "
+        f"{'upl p99':>8} {'errors':>7} {'cpu %':>6} {'cpu max':>7} {'rss MB':>7}"
+    )
+    if baseline:
+        header += f" {'Δp99':>8}"
+    print(header)
+    print("─" * len(header))
+    for r in results:
+        ask, upload = r.get("ask", {}), r.get("upload", {})
+
+        def col(value, width, fmt=".1f"):
+            return f"{value:>{width}{fmt}}" if value is not None else f"{'-':>{width}}"
+
+        line = (
+            f"{r['users']:>5} {col(r['throughput_per_s'], 8)} {col(ask.get('p50_ms'), 8)} "
+            f"{col(ask.get('p95_ms'), 8)} {col(ask.get('p99_ms'), 8)} {col(upload.get('p99_ms'), 8)} "
+            f"{r['error_rate']:>7.2%} {col(r['cpu_percent_mean'], 6)} {col(r['cpu_percent_max'], 7)} "
+            f"{col(r['rss_mb_max'], 7)}"
+        )
+        if baseline:
+            before = previous.get(r["users"])
+            line += f" {ask['p99_ms'] - before:>+8.1f}" if before and ask else f" {'-':>8}"
+        print(line)
+
+
+def sustained_users(results: list[dict], slo_p99_ms: float, max_error_rate: float) -> int:
+    """Highest concurrency whose ask p99 and error rate met the SLO (0 if none)."""
+    ok = [
+        r["users"] for r in results
+        if "ask" in r and r["ask"]["p99_ms"] <= slo_p99_ms and r["error_rate"] <= max_error_rate
+    ]
+    return max(ok, default=0)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the API in-process with simulated recruiters.")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels to run")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean think time between requests (s)")
+    parser.add_argument("--upload-ratio", type=float, default=0.0, help="Share of requests that upload a document")
+    parser.add_argument("--questions", type=Path, help="Question mix (one per line; default: example questions)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-seconds", type=float, default=1.0, help="CPU/RSS sampling interval")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (s)")
+    parser.add_argument("--ready-timeout", type=float, default=900.0, help="Max wait for /health/ready (s)")
+    parser.add_argument("--no-semantic-cache", action="store_true", help="Disable the semantic answer cache")
+    parser.add_argument("--collections-dir", type=Path, help="Run against this COLLECTIONS_DIR (default: a fresh temp dir)")
+    parser.add_argument("--slo-p99-ms", type=float, help="Ask p99 latency objective")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate allowed within the SLO")
+    parser.add_argument("--require-users", type=int, help="Exit 1 unless this many users meet the SLO")
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--compare", type=Path, help="Previous JSON results to diff against")
+    args = parser.parse_args(argv)
+
+    if importlib.util.find_spec("httpx") is None:
+        parser.exit(1, "The load test needs httpx (pip install httpx)\n")
+    if args.require_users and args.slo_p99_ms is None:
+        parser.error("--require-users needs --slo-p99-ms")
+    if args.no_semantic_cache:
+        os.environ["SEMANTIC_CACHE_SIZE"] = "0"
+    scratch_dir = None if args.collections_dir else Path(tempfile.mkdtemp(prefix="documind-loadtest-"))
+    collections_dir = args.collections_dir or scratch_dir
+    os.environ["COLLECTIONS_DIR"] = str(collections_dir)
+    os.environ["EMBEDDING_CACHE_PATH"] = str(collections_dir / "embedding_cache.db")
+
+    # The app's modules read COLLECTIONS_DIR and EMBEDDING_CACHE_PATH on import.
+    from app.benchmark import environment, synthetic_corpus
+    from app.ingest import load_questions
+
+    logging.basicConfig(level=logging.WARNING)
+    questions = load_questions(args.questions) if args.questions else load_questions()
+    documents = synthetic_corpus(200, seed=args.seed) if args.upload_ratio > 0 else []
+
+    try:
+        results = asyncio.run(run(args, questions, documents))
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else None
+    print_table(results, baseline)
+
+    if args.output:
+        report = {"environment": environment(), "args": {k: str(v) for k, v in vars(args).items()}, "results": results}
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.output}")
+
+    if args.slo_p99_ms is not None:
+        users = sustained_users(results, args.slo_p99_ms, args.max_error_rate)
+        print(f"\nSustained {users} concurrent users within p99 ≤ {args.slo_p99_ms:g} ms "
+              f"and ≤ {args.max_error_rate:.1%} errors")
+        if args.require_users and users < args.require_users:
+            parser.exit(1, f"Below the required {args.require_users} users\n")
+
+
+if __name__ == "__main__":
+    main()
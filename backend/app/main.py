@@ -1,35 +1,68 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.ingest import load_documents
-from app.chunking import fixed_chunk
-from app.embeddings import embed_texts, get_dimension, MODELS, DEFAULT_MODEL
-from app.vector_store import VectorStore
+from fastapi.responses import PlainTextResponse
+from app.embeddings import MODELS, DEFAULT_MODEL
+from app.collection import CollectionManager
+from app.health import Startup, create_health_routes
+from app.profiling import create_profiling_routes, sampler
+from app.watcher import DataDirWatcher
+from app.snapshot import SNAPSHOT_DIR
 from app.api import create_routes
+from app import metrics
 
-# ── Document ingestion ─────────────────────────────────────────────────────
-docs = load_documents("data")
+# ── Document collections ───────────────────────────────────────────────────
+# Optional background watcher per loaded collection: picks up files added,
+# edited or deleted in its data folder without a restart.
+watch_enabled = os.getenv("WATCH_DATA_DIR", "").lower() in ("1", "true", "yes")
 
-all_chunks: list = []
-sources: list = []
 
-for doc in docs:
-    chunks = fixed_chunk(doc["text"])
-    all_chunks.extend(chunks)
-    sources.extend([doc["source"]] * len(chunks))
+def make_watcher(indexer):
+    return DataDirWatcher(
+        indexer,
+        debounce=float(os.getenv("WATCH_DEBOUNCE_SECONDS", "1.0")),
+        poll_interval=float(os.getenv("WATCH_POLL_SECONDS", "2.0")),
+    )
 
-# Use the default embedding model for the initial index
-embeddings = embed_texts(all_chunks)
 
-dimension = get_dimension()
-vector_store = VectorStore(dimension)
-vector_store.add(embeddings, all_chunks, sources)
+collections = CollectionManager(
+    watcher_factory=make_watcher if watch_enabled else None,
+    snapshot_dir=SNAPSHOT_DIR or None,
+)
+# Models and the default collection (backend/data) load in a background
+# task once the server is up; other collections load on first use.
+startup = Startup(collections)
+
+metrics.INDEX_SIZE.set_function(
+    lambda: sum(c.vector_store.ntotal for c in collections.loaded())
+)
+metrics.INDEX_DOCUMENTS.set_function(
+    lambda: sum(len(c.vector_store.documents()) for c in collections.loaded())
+)
+metrics.QUEUE_DEPTH.set_function(
+    lambda: sum(c.watcher.pending() for c in collections.loaded() if c.watcher is not None)
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    collections.start()
+    startup.start()
+    if sampler is not None:
+        sampler.start()
+    yield
+    if sampler is not None:
+        sampler.stop()
+    collections.stop()
+
 
 # ── FastAPI app ────────────────────────────────────────────────────────────
 app = FastAPI(
     title="DocuMind IN — Document Intelligence API",
     description="RAG-powered document Q&A for Indian MNCs and IT consulting firms.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # ── CORS — allow the frontend origin (env-configurable) ───────────────────
@@ -63,9 +96,15 @@ def list_models():
         "default": DEFAULT_MODEL,
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return metrics.render()
+
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "DocuMind API is running!"}
 
 # ── Routes ─────────────────────────────────────────────────────────────────
-app.include_router(create_routes(vector_store))
+app.include_router(create_routes(collections))
+app.include_router(create_health_routes(startup))
+app.include_router(create_profiling_routes())
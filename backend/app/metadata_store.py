@@ -0,0 +1,222 @@
+"""
+metadata_store.py — SQLite store for documents and chunk text.
+
+Holds what used to live in VectorStore's Python lists: one row per
+document (content hash, embedding model, chunker settings, chunk count,
+ingestion time) and one row per chunk (text, page, position).  The FAISS
+index stores chunk ids, so a search hit is resolved with a primary-key
+lookup here.
+
+File-backed stores run in WAL mode with one connection per thread (see
+sqlite_db.py), so readers in any thread or worker process never block on
+the writer.  Writes for a document are batched into a single transaction.  A small
+stats table counts how often each document is returned by queries, so
+startup can ingest the most-used documents first.
+An in-memory store (":memory:") is used when no path is given — e.g.
+by the benchmark — and serialises access over one connection.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from app.sqlite_db import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id            INTEGER PRIMARY KEY,
+    name          TEXT NOT NULL UNIQUE,
+    content_hash  TEXT,
+    model         TEXT,
+    chunker       TEXT,
+    chunk_count   INTEGER NOT NULL DEFAULT 0,
+    indexed_at    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id  INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    ordinal      INTEGER NOT NULL,
+    page         INTEGER,
+    text         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_document ON chunks(document_id);
+CREATE TABLE IF NOT EXISTS document_stats (
+    name        TEXT PRIMARY KEY,
+    query_hits  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class MetadataStore(SQLiteDatabase):
+    def __init__(self, path: str | Path = ":memory:"):
+        super().__init__(path, SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = super()._connect()
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    # ── Writes ──────────────────────────────────────────────────────────
+    def replace_document(
+        self,
+        name: str,
+        chunks: list[str],
+        pages: list[Optional[int]],
+        content_hash: Optional[str] = None,
+        model: Optional[str] = None,
+        chunker: Optional[str] = None,
+    ) -> tuple[list[int], list[int]]:
+        """
+        Replace a document and all its chunks in one transaction.
+
+        Returns (new chunk ids, chunk ids that were removed).
+        """
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._transaction() as conn:
+            old = conn.execute(
+                "SELECT c.id FROM chunks c JOIN documents d ON d.id = c.document_id WHERE d.name = ?",
+                (name,),
+            ).fetchall()
+            conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+            doc_id = conn.execute(
+                "INSERT INTO documents (name, content_hash, model, chunker, chunk_count, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, content_hash, model, chunker, len(chunks), now),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO chunks (document_id, ordinal, page, text) VALUES (?, ?, ?, ?)",
+                [(doc_id, i, page, text) for i, (text, page) in enumerate(zip(chunks, pages))],
+            )
+            # AUTOINCREMENT ids are never reused and, inside this
+            # exclusive transaction, are consecutive.
+            last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            ids = list(range(last - len(chunks) + 1, last + 1)) if chunks else []
+        return ids, [row[0] for row in old]
+
+    def add_chunks(
+        self,
+        sources: list[str],
+        chunks: list[str],
+        pages: list[Optional[int]],
+    ) -> list[int]:
+        """Append chunks (creating documents as needed) in one transaction."""
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        if not chunks:
+            return []
+        with self._transaction() as conn:
+            doc_ids: dict[str, int] = {}
+            for name in dict.fromkeys(sources):
+                conn.execute(
+                    "INSERT OR IGNORE INTO documents (name, chunk_count, indexed_at) VALUES (?, 0, ?)",
+                    (name, now),
+                )
+                doc_ids[name] = conn.execute("SELECT id FROM documents WHERE name = ?", (name,)).fetchone()[0]
+            base = {
+                doc_id: conn.execute("SELECT chunk_count FROM documents WHERE id = ?", (doc_id,)).fetchone()[0]
+                for doc_id in doc_ids.values()
+            }
+            rows, counts = [], dict(base)
+            for name, text, page in zip(sources, chunks, pages):
+                doc_id = doc_ids[name]
+                rows.append((doc_id, counts[doc_id], page, text))
+                counts[doc_id] += 1
+            conn.executemany(
+                "INSERT INTO chunks (document_id, ordinal, page, text) VALUES (?, ?, ?, ?)", rows
+            )
+            last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.executemany(
+                "UPDATE documents SET chunk_count = ? WHERE id = ?",
+                [(count, doc_id) for doc_id, count in counts.items()],
+            )
+        return list(range(last - len(chunks) + 1, last + 1))
+
+    def delete_document(self, name: str) -> list[int]:
+        """Delete a document; returns the ids of its chunks."""
+        with self._transaction() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT c.id FROM chunks c JOIN documents d ON d.id = c.document_id WHERE d.name = ?",
+                (name,),
+            )]
+            conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+        return ids
+
+    def add_query_hits(self, counts: dict[str, int]) -> None:
+        """Add to how often each document appeared in query results."""
+        if not counts:
+            return
+        with self._write_lock:
+            self._conn().executemany(
+                "INSERT INTO document_stats (name, query_hits) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET query_hits = query_hits + excluded.query_hits",
+                list(counts.items()),
+            )
+
+    def backup(self, path: str | Path) -> None:
+        """Write a consistent single-file copy of the database to `path`."""
+        dest = sqlite3.connect(str(path))
+        try:
+            with self._write_lock:
+                self._conn().backup(dest)
+        finally:
+            dest.close()
+
+    # ── Reads ───────────────────────────────────────────────────────────
+    def get_chunks(self, ids: list[int]) -> dict[int, dict[str, Any]]:
+        """Chunk id -> {text, source, page} for the given ids."""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = self._read(
+            "SELECT c.id, c.text, c.page, d.name FROM chunks c "
+            f"JOIN documents d ON d.id = c.document_id WHERE c.id IN ({placeholders})",
+            [int(i) for i in ids],
+        )
+        return {row["id"]: {"text": row["text"], "source": row["name"], "page": row["page"]} for row in rows}
+
+    def document(self, name: str) -> Optional[dict[str, Any]]:
+        rows = self._read("SELECT * FROM documents WHERE name = ?", (name,))
+        return dict(rows[0]) if rows else None
+
+    def documents(self) -> list[dict[str, Any]]:
+        """All documents with their chunk counts and ingestion metadata."""
+        return [dict(row) for row in self._read("SELECT * FROM documents ORDER BY name")]
+
+    def document_names(self) -> list[str]:
+        return [row[0] for row in self._read("SELECT name FROM documents ORDER BY name")]
+
+    def chunk_ids(self, name: str) -> list[int]:
+        return [row[0] for row in self._read(
+            "SELECT c.id FROM chunks c JOIN documents d ON d.id = c.document_id "
+            "WHERE d.name = ? ORDER BY c.ordinal",
+            (name,),
+        )]
+
+    def model_chunk_ids(self, model: str) -> list[int]:
+        """Ids of every chunk embedded with `model`."""
+        return [row[0] for row in self._read(
+            "SELECT c.id FROM chunks c JOIN documents d ON d.id = c.document_id WHERE d.model = ?",
+            (model,),
+        )]
+
+    def iter_chunks(self, batch_size: int = 1024) -> Iterator[list[sqlite3.Row]]:
+        """Yield (id, text, name, model) rows in id order, in batches."""
+        last = 0
+        while True:
+            rows = self._read(
+                "SELECT c.id, c.text, d.name, d.model FROM chunks c "
+                "JOIN documents d ON d.id = c.document_id WHERE c.id > ? ORDER BY c.id LIMIT ?",
+                (last, batch_size),
+            )
+            if not rows:
+                return
+            yield rows
+            last = rows[-1]["id"]
+
+    def query_hits(self) -> dict[str, int]:
+        """Document name -> times it appeared in query results."""
+        return {row[0]: row[1] for row in self._read("SELECT name, query_hits FROM document_stats")}
+
+    def count_chunks(self) -> int:
+        return self._read("SELECT COUNT(*) FROM chunks")[0][0]
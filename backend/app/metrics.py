@@ -0,0 +1,230 @@
+"""
+metrics.py — In-process latency spans, counters and a Prometheus exporter.
+
+Pipeline code wraps each stage in `span("name")`.  Every span is
+recorded in the `documind_stage_seconds` histogram and, while a request
+is being tracked with `track_request()`, in that request's per-stage
+breakdown.  Requests slower than SLOW_REQUEST_MS are logged with the
+breakdown so a slow answer can be attributed to embedding, search,
+filtering, guardrails or answer generation.  Work that is not serving
+traffic (startup warm-up) runs under `unrecorded()` and stays out of the
+histogram.
+
+`render()` produces the Prometheus text exposition format served on
+/metrics; no client library is required.
+"""
+
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+log = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_fmt_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A gauge that is either set directly or read from a callback."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help):
+        super().__init__(name, help)
+        self._value = 0.0
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self._fn = fn
+
+    def value(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return float("nan")
+        return self._value
+
+    def render(self) -> list[str]:
+        return self._header() + [f"{self.name} {self.value()}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                label_values, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[i] += 1
+            total[0] += value
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        with self._lock:
+            series = {k: (list(c), t[0]) for k, (c, t) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _fmt_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            le = _fmt_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+# ── Metrics ─────────────────────────────────────────────────────────────
+STAGE_SECONDS = Histogram(
+    "documind_stage_seconds", "Latency of each pipeline stage.", labels=("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "documind_request_seconds", "End-to-end latency per route.", labels=("route",)
+)
+CACHE_HITS = Counter("documind_cache_hits_total", "Cache hits by cache.", labels=("cache",))
+CACHE_MISSES = Counter("documind_cache_misses_total", "Cache misses by cache.", labels=("cache",))
+CHUNKS_INDEXED = Counter("documind_chunks_indexed_total", "Chunks embedded and added to the index.")
+INDEX_SIZE = Gauge("documind_index_vectors", "Vectors currently in the index.")
+INDEX_DOCUMENTS = Gauge("documind_index_documents", "Documents currently in the index.")
+QUEUE_DEPTH = Gauge("documind_ingest_queue_depth", "Files waiting to be (re)indexed.")
+INFLIGHT = Gauge("documind_inflight_requests", "Requests currently being handled.")
+
+
+# ── Spans ───────────────────────────────────────────────────────────────
+_breakdown: ContextVar[Optional[dict[str, float]]] = ContextVar("_breakdown", default=None)
+_recording: ContextVar[bool] = ContextVar("_recording", default=True)
+
+
+@contextmanager
+def unrecorded() -> Iterator[None]:
+    """Keep spans inside the block out of documind_stage_seconds."""
+    token = _recording.set(False)
+    try:
+        yield
+    finally:
+        _recording.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into the histogram and the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if _recording.get():
+            STAGE_SECONDS.observe(elapsed, stage)
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            breakdown[stage] = breakdown.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def track_request(route: str, detail: str = "") -> Iterator[dict[str, float]]:
+    """
+    Track one request: total latency, in-flight gauge and the slow log.
+
+    Yields the per-stage breakdown dict that `span()` fills in.
+    """
+    breakdown: dict[str, float] = {}
+    token = _breakdown.set(breakdown)
+    INFLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        yield breakdown
+    finally:
+        elapsed = time.perf_counter() - start
+        INFLIGHT.dec()
+        try:
+            _breakdown.reset(token)
+        except ValueError:
+            # A streaming response closed from another context (client
+            # disconnect); the variable dies with that context anyway.
+            pass
+        REQUEST_SECONDS.observe(elapsed, route)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            stages = ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in breakdown.items())
+            log.warning("Slow %s (%.1fms) %s [%s]", route, elapsed * 1000, detail, stages)
+
+
+def render() -> str:
+    """Prometheus text exposition of every registered metric."""
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,234 @@
+"""
+profiling.py — Opt-in per-request profiles and a low-rate sampling profiler.
+
+Per request: send `X-Profile: 1` with the DOCS_API_KEY as `X-API-Key`
+to /ask-recruiter or /ask-recruiter/stream.  The request runs under
+cProfile, the profile is stored under PROFILE_DIR and its id is returned
+in the `X-Profile-Id` response header (for a stream, the profile is
+written when the stream ends).  cProfile sees only the threads doing the
+request's work: retrieval, guardrails and answer generation are covered,
+but with INDEX_SHARDS > 1 the per-shard FAISS searches run on the shared
+shard-search pool and show up only as the wait in
+ShardedVectorStore.search — profile with INDEX_SHARDS=1 to see them.
+
+Continuously: PROFILE_SAMPLING=1 starts a background thread that samples
+every thread's stack each PROFILE_SAMPLE_SECONDS and aggregates them in
+folded-stack format, ready for flamegraph.pl or speedscope.
+
+  GET /debug/profiles               stored profile ids, newest first
+  GET /debug/profiles/sampling      folded stacks from the sampler (?reset=1)
+  GET /debug/profiles/{id}          the .prof file (pstats / snakeviz)
+  GET /debug/profiles/{id}?format=text   top functions by cumulative time
+
+All of these require DOCS_API_KEY; with no key configured profiling is off.
+"""
+
+import io
+import os
+import sys
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+
+log = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(BACKEND_DIR / "profiles")))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_SAMPLING = os.getenv("PROFILE_SAMPLING", "").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_SECONDS = float(os.getenv("PROFILE_SAMPLE_SECONDS", "0.05"))
+
+_ID_CHARS = set("0123456789abcdef-")
+
+
+# ── Per-request profiles ────────────────────────────────────────────────
+def _prune(keep: int = PROFILE_KEEP) -> None:
+    profiles = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in profiles[keep:]:
+        old.unlink(missing_ok=True)
+
+
+class RequestProfile:
+    """
+    One request's profile, collected across one or more calls.
+
+    A streamed answer runs piecewise on whichever threadpool thread is
+    free, so each piece is run through `call()`, which profiles that
+    thread for the duration of the call.  `save()` writes the profile if
+    anything was recorded.
+    """
+
+    def __init__(self, label: str = ""):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self._profiler = cProfile.Profile()
+        self._recorded = False
+
+    def enable(self) -> bool:
+        try:
+            self._profiler.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one profiler per process at a time.
+            log.warning("Cannot profile request: %s", e)
+            return False
+        self._recorded = True
+        return True
+
+    def disable(self) -> None:
+        self._profiler.disable()
+
+    def call(self, fn, *args, **kwargs):
+        """`fn(*args, **kwargs)`, profiled."""
+        enabled = self.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if enabled:
+                self.disable()
+
+    def save(self) -> None:
+        if not self._recorded:
+            return
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        self._profiler.dump_stats(str(PROFILE_DIR / f"{self.id}.prof"))
+        _prune()
+        log.info("Stored profile %s %s", self.id, self.label)
+
+
+@contextmanager
+def profile_request(enabled: bool, label: str = "") -> Iterator[Optional[str]]:
+    """
+    Run the block under cProfile when `enabled`; yields the profile id
+    (None when disabled).  The profile is written when the block exits.
+    """
+    if not enabled:
+        yield None
+        return
+    profile = RequestProfile(label)
+    if not profile.enable():
+        yield None
+        return
+    try:
+        yield profile.id
+    finally:
+        profile.disable()
+        profile.save()
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    if not profile_id or not set(profile_id) <= _ID_CHARS:
+        return None
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    return path if path.is_file() else None
+
+
+def profile_text(path: Path, limit: int = 40) -> str:
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+# ── Sampling profiler ───────────────────────────────────────────────────
+class SamplingProfiler:
+    """Aggregates periodic stack samples of every thread as folded stacks."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_SECONDS):
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stacks.append(";".join([names.get(ident, str(ident)), *reversed(frames)]))
+        with self._lock:
+            self.samples.update(stacks)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        log.info("Sampling profiler running every %.3fs", self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def folded(self, reset: bool = False) -> str:
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+            if reset:
+                self.samples.clear()
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+sampler: Optional[SamplingProfiler] = SamplingProfiler() if PROFILE_SAMPLING else None
+
+
+# ── Routes ──────────────────────────────────────────────────────────────
+def profiling_allowed(x_api_key: str | None) -> bool:
+    docs_api_key = os.getenv("DOCS_API_KEY", "").strip()
+    return bool(docs_api_key) and x_api_key == docs_api_key
+
+
+def create_profiling_routes() -> APIRouter:
+    router = APIRouter(prefix="/debug/profiles")
+
+    def check_access(x_api_key: str | None):
+        if not profiling_allowed(x_api_key):
+            raise HTTPException(status_code=403, detail="Profiling requires DOCS_API_KEY")
+
+    @router.get("")
+    def list_profiles(x_api_key: str | None = Header(default=None, alias="X-API-Key")):
+        check_access(x_api_key)
+        profiles = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+        return {"profiles": [p.stem for p in profiles], "sampling": sampler is not None}
+
+    @router.get("/sampling", response_class=PlainTextResponse)
+    def sampling_profile(
+        reset: bool = Query(default=False),
+        x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+    ):
+        check_access(x_api_key)
+        if sampler is None:
+            raise HTTPException(status_code=404, detail="Sampling profiler is off (PROFILE_SAMPLING=1)")
+        return sampler.folded(reset=reset)
+
+    @router.get("/{profile_id}")
+    def get_profile(
+        profile_id: str,
+        format: str = Query(default="prof", pattern="^(prof|text)$"),
+        x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+    ):
+        check_access(x_api_key)
+        path = profile_path(profile_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        if format == "text":
+            return PlainTextResponse(profile_text(path))
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+    return router
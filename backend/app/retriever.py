@@ -1,4 +1,5 @@
 from app.embeddings import embed_query
+from app.metrics import span
 from typing import Optional, List
 
 
@@ -7,14 +8,21 @@ def retrieve(
     vector_store,
     top_k: int = 3,
     source_filter: Optional[List[str]] = None,
+    query_vec=None,
 ):
-    query_vec = embed_query(query)
-    results = vector_store.search(query_vec, top_k=top_k)
+    # Callers that need the query embedding afterwards (extractive
+    # answers) compute it once and pass it in.
+    if query_vec is None:
+        with span("embed_query"):
+            query_vec = embed_query(query)
+    with span("search"):
+        results = vector_store.search(query_vec, top_k=top_k)
 
     # If the user locked specific documents, filter results to those sources only
     if source_filter:
-        filter_set = set(source_filter)
-        filtered = [r for r in results if r["source"] in filter_set]
+        with span("filter"):
+            filter_set = set(source_filter)
+            filtered = [r for r in results if r["source"] in filter_set]
         # Intentional graceful degradation:
         # If none of the locked documents matched (e.g. the file was uploaded
         # in the UI but not yet ingested into the vector store), we fall back
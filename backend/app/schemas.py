@@ -17,6 +17,14 @@ class AskRequest(BaseModel):
     similarity_threshold: float = Field(default=0.5, ge=0.0, le=1.0)
     max_tokens: int = Field(default=512, ge=64, le=4096)
 
+    # "chunks" returns whole retrieved chunks; "extractive" returns only
+    # the best-matching sentences, packed into max_tokens
+    answer_mode: Literal["chunks", "extractive"] = "chunks"
+
+    # Document collection to search; defaults to the one bound to the
+    # caller's API key, else "default"
+    collection: Optional[str] = Field(default=None, pattern=r"^[A-Za-z0-9_-]{1,64}$")
+
     # Embedding model — only two supported options
     embedding_model: Literal["MiniLM-L6", "MPNet-Base"] = "MiniLM-L6"
 
@@ -26,3 +34,4 @@ class AskResponse(BaseModel):
     confidence: str
     source_documents: List[str]
     similarity_score: float
+    index_complete: bool = True
@@ -0,0 +1,97 @@
+"""
+semantic_cache.py — Answer cache keyed by question meaning.
+
+Recruiters ask the same thing in many phrasings ("notice period?", "how
+long is the notice period"), so an exact-match cache rarely hits.  Each
+collection keeps a small FAISS index of recently answered question
+embeddings; a new question whose cosine similarity to a cached one is at
+least SEMANTIC_CACHE_THRESHOLD, asked with the same options against the
+same index version, gets the cached answer without a vector search or
+answer generation.
+
+Any change to the collection's index (upload, delete, watcher re-index)
+bumps its version and empties the cache.  At most SEMANTIC_CACHE_SIZE
+questions are kept per collection, oldest dropped first; 0 disables the
+cache.  Hits and misses are counted in documind_cache_{hits,misses}_total
+with cache="semantic".
+"""
+
+import os
+import logging
+import threading
+from collections import deque
+from typing import Any, Hashable, Optional
+
+import faiss
+import numpy as np
+
+from app.metrics import CACHE_HITS, CACHE_MISSES
+
+log = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+# Neighbours checked per lookup: the closest question may have been
+# asked with different options.
+_CANDIDATES = 8
+
+
+class SemanticCache:
+    def __init__(self, dimension: int, size: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.dimension = dimension
+        self.size = size
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._reset(version=None)
+
+    def _reset(self, version: Optional[int]) -> None:
+        self.version = version
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        self._entries: dict[int, tuple[Hashable, Any]] = {}
+        self._order: deque[int] = deque()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query_vec, key: Hashable, version: int) -> Optional[Any]:
+        """The value cached for a close enough question with this key, or None."""
+        query_vec = np.asarray(query_vec, dtype="float32").reshape(1, -1)
+        with self._lock:
+            if version != self.version:
+                self._reset(version)
+            found = None
+            if self._entries:
+                scores, ids = self._index.search(query_vec, min(_CANDIDATES, len(self._entries)))
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if score < self.threshold:
+                        break
+                    entry = self._entries.get(int(entry_id))
+                    if entry is not None and entry[0] == key:
+                        found = entry[1]
+                        break
+        if found is None:
+            CACHE_MISSES.inc(1, "semantic")
+        else:
+            CACHE_HITS.inc(1, "semantic")
+        return found
+
+    def put(self, query_vec, key: Hashable, version: int, value: Any) -> None:
+        """Cache `value` for a question answered against index `version`."""
+        if self.size <= 0:
+            return
+        query_vec = np.asarray(query_vec, dtype="float32").reshape(1, -1)
+        with self._lock:
+            if version != self.version:
+                # Answered against an index that has changed since.
+                return
+            while len(self._order) >= self.size:
+                oldest = self._order.popleft()
+                self._entries.pop(oldest, None)
+                self._index.remove_ids(np.asarray([oldest], dtype="int64"))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(query_vec, np.asarray([entry_id], dtype="int64"))
+            self._entries[entry_id] = (key, value)
+            self._order.append(entry_id)
@@ -0,0 +1,200 @@
+"""
+sharded_store.py — Vector index split into shards searched in parallel.
+
+Documents are assigned to one of N shards by a stable hash of their
+name, so every chunk of a document lives in one shard and re-indexing a
+document touches only that shard.  Each shard is an ordinary VectorStore
+sharing the collection's MetadataStore.  A query is fanned out to all
+shards on a thread pool (FAISS releases the GIL while searching) and the
+per-shard top-k lists are merged with a heap.
+
+Shards are rebuilt, saved and loaded one at a time.  While a shard is
+rebuilt the old copy keeps serving queries; only writes to that shard
+wait for the swap.
+"""
+
+import os
+import heapq
+import zlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.metadata_store import MetadataStore
+from app.vector_store import VectorStore
+
+log = logging.getLogger(__name__)
+
+INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "1"))
+
+# One pool for every sharded store in the process, so loading and evicting
+# collections never creates or leaks threads.
+_search_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="shard-search")
+
+
+def shard_for(source: str, shards: int) -> int:
+    """Stable shard number for a document name."""
+    return zlib.crc32(source.encode("utf-8")) % shards
+
+
+def make_vector_store(
+    dimension: int,
+    metadata_store: Optional[MetadataStore] = None,
+    shards: int = 1,
+    **options,
+):
+    """A VectorStore, or a ShardedVectorStore when shards > 1."""
+    if shards > 1:
+        return ShardedVectorStore(dimension, metadata_store, shards=shards, **options)
+    return VectorStore(dimension, metadata_store, **options)
+
+
+class ShardedVectorStore:
+    """Drop-in VectorStore replacement holding `shards` independent indexes."""
+
+    def __init__(
+        self,
+        dimension: int,
+        metadata_store: Optional[MetadataStore] = None,
+        shards: int = INDEX_SHARDS,
+        vectors_path: Optional[Path] = None,
+        **store_kwargs,
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.dimension = dimension
+        self.metadata_store = metadata_store or MetadataStore()
+        self._vectors_path = Path(vectors_path) if vectors_path is not None else None
+        self._store_kwargs = store_kwargs
+        self.shards = [self._new_shard(i) for i in range(shards)]
+        # Serialises writes to one shard with a rebuild of that shard.
+        self._write_locks = [threading.Lock() for _ in range(shards)]
+
+    def _new_shard(self, i: int) -> VectorStore:
+        path = None
+        if self._vectors_path is not None:
+            path = self._vectors_path.with_name(f"{self._vectors_path.stem}.shard{i}{self._vectors_path.suffix}")
+        return VectorStore(self.dimension, self.metadata_store, vectors_path=path, **self._store_kwargs)
+
+    def _shard_of(self, source: str) -> int:
+        return shard_for(source, len(self.shards))
+
+    def _group(self, sources: List[str]) -> Dict[int, List[int]]:
+        """Shard number -> positions of the items that belong to it."""
+        groups: Dict[int, List[int]] = {}
+        for pos, source in enumerate(sources):
+            groups.setdefault(self._shard_of(source), []).append(pos)
+        return groups
+
+    # ── VectorStore interface ───────────────────────────────────────────
+    def add(
+        self,
+        embeddings,
+        chunks: List[str],
+        sources: List[str],
+        pages: Optional[List[Optional[int]]] = None,
+    ) -> None:
+        embeddings = np.asarray(embeddings, dtype="float32")
+        pages = pages if pages is not None else [None] * len(chunks)
+        for i, positions in self._group(sources).items():
+            with self._write_locks[i]:
+                self.shards[i].add(
+                    embeddings[positions],
+                    [chunks[p] for p in positions],
+                    [sources[p] for p in positions],
+                    [pages[p] for p in positions],
+                )
+
+    def attach(self, ids: List[int], embeddings, sources: Optional[List[str]] = None) -> None:
+        """Add vectors for stored chunks; `sources` picks each chunk's shard."""
+        if sources is None:
+            raise ValueError("A sharded store needs the source of each attached chunk")
+        embeddings = np.asarray(embeddings, dtype="float32")
+        for i, positions in self._group(sources).items():
+            with self._write_locks[i]:
+                self.shards[i].attach([ids[p] for p in positions], embeddings[positions])
+
+    def remove_source(self, source: str) -> int:
+        i = self._shard_of(source)
+        with self._write_locks[i]:
+            return self.shards[i].remove_source(source)
+
+    def replace_source(self, source: str, embeddings, chunks: List[str], pages=None, **document_fields) -> None:
+        i = self._shard_of(source)
+        with self._write_locks[i]:
+            self.shards[i].replace_source(source, embeddings, chunks, pages, **document_fields)
+
+    def documents(self) -> List[str]:
+        return self.metadata_store.document_names()
+
+    @property
+    def trained(self) -> bool:
+        return all(shard.trained for shard in self.shards)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    def ids(self) -> np.ndarray:
+        return np.concatenate([shard.ids() for shard in self.shards])
+
+    @property
+    def version(self) -> int:
+        return max(shard.version for shard in self.shards)
+
+    def memory_bytes(self) -> int:
+        return sum(shard.memory_bytes() for shard in self.shards)
+
+    def search_ids(self, query_embedding, top_k: int = 3) -> List[Tuple[int, float]]:
+        shards = list(self.shards)
+        if len(shards) == 1:
+            return shards[0].search_ids(query_embedding, top_k)
+        futures = [_search_pool.submit(shard.search_ids, query_embedding, top_k) for shard in shards]
+        return heapq.nlargest(top_k, chain.from_iterable(f.result() for f in futures), key=lambda hit: hit[1])
+
+    def search(self, query_embedding, top_k: int = 3) -> List[Dict[str, Any]]:
+        return self.shards[0].resolve(self.search_ids(query_embedding, top_k))
+
+    # ── Per-shard maintenance ───────────────────────────────────────────
+    def shard_documents(self, i: int) -> List[str]:
+        return [name for name in self.metadata_store.document_names() if self._shard_of(name) == i]
+
+    def rebuild_shard(self, i: int, embed: Callable[[List[str]], Any]) -> int:
+        """
+        Re-embed shard i's stored chunks into a fresh index and swap it in.
+
+        Queries keep using the old shard until the swap.  Returns the
+        number of vectors in the new shard.
+        """
+        with self._write_locks[i]:
+            shard = self._new_shard(i)
+            for name in self.shard_documents(i):
+                ids = self.metadata_store.chunk_ids(name)
+                rows = self.metadata_store.get_chunks(ids)
+                ids = [cid for cid in ids if cid in rows]
+                if ids:
+                    shard.attach(ids, embed([rows[cid]["text"] for cid in ids]))
+            self.shards[i] = shard
+        log.info("Rebuilt shard %d (%d vectors)", i, shard.ntotal)
+        return shard.ntotal
+
+    def shard_path(self, directory: Path, i: int) -> Path:
+        return Path(directory) / f"shard-{i}.faiss"
+
+    def save_shard(self, i: int, directory: Path) -> Path:
+        path = self.shard_path(directory, i)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.shards[i].save(path)
+        return path
+
+    def load_shard(self, i: int, directory: Path) -> None:
+        """Swap shard i for the copy saved in `directory`."""
+        with self._write_locks[i]:
+            shard = self._new_shard(i)
+            shard.load(self.shard_path(directory, i))
+            self.shards[i] = shard
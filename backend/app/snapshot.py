@@ -0,0 +1,276 @@
+"""
+snapshot.py — Build and load prebuilt index snapshots.
+
+A snapshot is a folder holding everything a replica needs to serve a
+data folder without embedding it:
+
+  manifest.json      model, dimension, chunker, index settings, counts
+                     and a sha256 checksum for every other file
+  metadata.db        documents and chunks (SQLite)
+  index.faiss        the FAISS index, or shard-<n>.faiss per shard
+  *.pca              fitted PCA projections, when REDUCE_DIM is set
+  vectors*.f32       full-precision vectors, when re-scoring is enabled
+
+Index settings (INDEX_TYPE, INDEX_SHARDS, REDUCE_DIM, ...) are taken
+from the environment at build time and recorded in the manifest; the
+loader rebuilds the store from the manifest, not the environment.
+
+At startup, SNAPSHOT_DIR installs a snapshot into the default
+collection when it has no metadata database yet.  The snapshot is
+refused if its model, dimension or chunker differ from the running
+server's, or if any checksum fails.
+
+Every collection also saves its index to <storage>/index/ after
+ingestion and on shutdown or eviction (`save_local`).  A restart loads
+it (`load_local`) instead of re-embedding, as long as it was built with
+the same model, chunker and index settings and holds exactly the chunks
+in metadata.db; otherwise the index is rebuilt from the stored chunks.
+
+Usage (from backend/):
+    python -m app.snapshot build --data data --out snapshots/default
+    python -m app.snapshot verify snapshots/default
+"""
+
+import os
+import json
+import shutil
+import logging
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.chunking import CHUNKER_ID
+from app.embeddings import get_dimension, DEFAULT_MODEL
+from app.indexer import Indexer, MODEL_ID, content_hash
+from app.metadata_store import MetadataStore
+from app.sharded_store import make_vector_store, INDEX_SHARDS
+from app.vector_store import INDEX_TYPE, REDUCE_DIM, REDUCTION, RESCORE_FACTOR
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "").strip()
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+INDEX_FILE = "index.faiss"
+VECTORS_FILE = "vectors.f32"
+LOCAL_INDEX_DIR = "index"
+LOCAL_MANIFEST = "index.json"
+SETTINGS = ("shards", "index_type", "rescore_factor", "reduce_dim", "reduction")
+
+
+class SnapshotError(RuntimeError):
+    """A snapshot is missing, corrupt or built for a different model."""
+
+
+def current_settings() -> dict:
+    """Index settings from the environment, as recorded in manifests."""
+    return {
+        "shards": max(1, INDEX_SHARDS),
+        "index_type": INDEX_TYPE,
+        "rescore_factor": RESCORE_FACTOR,
+        "reduce_dim": REDUCE_DIM,
+        "reduction": REDUCTION,
+    }
+
+
+def make_store(dimension: int, metadata_store: MetadataStore, settings: dict, vectors_dir: Path):
+    """An empty vector store configured by `settings`, keeping full vectors in `vectors_dir`."""
+    options = {key: settings[key] for key in SETTINGS}
+    return make_vector_store(dimension, metadata_store, vectors_path=Path(vectors_dir) / VECTORS_FILE, **options)
+
+
+def _save_index(store, directory: Path, shards: int) -> None:
+    if shards > 1:
+        for i in range(shards):
+            store.save_shard(i, directory)
+    else:
+        store.save(directory / INDEX_FILE)
+
+
+def _load_index(store, directory: Path, shards: int) -> None:
+    if shards > 1:
+        for i in range(shards):
+            store.load_shard(i, directory)
+    else:
+        store.load(directory / INDEX_FILE)
+
+
+# ── Build ───────────────────────────────────────────────────────────────
+def build(data_dir: Path, out_dir: Path) -> dict:
+    """Index `data_dir` into a new snapshot at `out_dir` (replaced if present)."""
+    data_dir, out_dir = Path(data_dir), Path(out_dir)
+    staging = out_dir.with_name(out_dir.name + ".partial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    manifest: dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "model": MODEL_ID,
+        "model_name": DEFAULT_MODEL,
+        "dimension": get_dimension(),
+        "chunker": CHUNKER_ID,
+        **current_settings(),
+    }
+    metadata_store = MetadataStore()
+    store = make_store(manifest["dimension"], metadata_store, manifest, staging)
+    Indexer(store, data_dir).index_folder()
+
+    _save_index(store, staging, manifest["shards"])
+    metadata_store.backup(staging / "metadata.db")
+
+    manifest.update(
+        documents=len(metadata_store.document_names()),
+        chunks=metadata_store.count_chunks(),
+        created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        files={p.name: content_hash(p) for p in sorted(staging.iterdir()) if p.is_file()},
+    )
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    staging.rename(out_dir)
+    log.info("Built snapshot %s (%d documents, %d chunks)", out_dir, manifest["documents"], manifest["chunks"])
+    return manifest
+
+
+# ── Load ────────────────────────────────────────────────────────────────
+def verify(snapshot_dir: Path, dimension: int | None = None) -> dict:
+    """
+    Check a snapshot against the running model and its checksums.
+
+    Returns the manifest; raises SnapshotError on any mismatch.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    try:
+        manifest = json.loads((snapshot_dir / MANIFEST).read_text())
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Cannot read {snapshot_dir / MANIFEST}: {e}")
+
+    if manifest.get("format") != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format')!r}")
+    if manifest.get("model") != MODEL_ID:
+        raise SnapshotError(f"Snapshot was built with {manifest.get('model')}, server uses {MODEL_ID}")
+    if dimension is not None and manifest.get("dimension") != dimension:
+        raise SnapshotError(f"Snapshot dimension {manifest.get('dimension')} != model dimension {dimension}")
+    if manifest.get("chunker") != CHUNKER_ID:
+        raise SnapshotError(f"Snapshot chunker {manifest.get('chunker')} != {CHUNKER_ID}")
+
+    for name, expected in manifest.get("files", {}).items():
+        path = snapshot_dir / name
+        if not path.is_file():
+            raise SnapshotError(f"Snapshot file missing: {name}")
+        if content_hash(path) != expected:
+            raise SnapshotError(f"Checksum mismatch: {name}")
+    return manifest
+
+
+def install(snapshot_dir: Path, storage_dir: Path, dimension: int) -> dict:
+    """
+    Verify a snapshot and copy its writable files (metadata database and
+    vectors) into a collection's storage folder.  Returns the manifest.
+    """
+    snapshot_dir, storage_dir = Path(snapshot_dir), Path(storage_dir)
+    manifest = verify(snapshot_dir, dimension)
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    for name in manifest["files"]:
+        if name == "metadata.db" or name.endswith(".f32"):
+            shutil.copyfile(snapshot_dir / name, storage_dir / name)
+    return manifest
+
+
+def open_store(snapshot_dir: Path, storage_dir: Path, manifest: dict, metadata_store: MetadataStore):
+    """Vector store configured as in the manifest, with the snapshot's index loaded."""
+    store = make_store(manifest["dimension"], metadata_store, manifest, storage_dir)
+    _load_index(store, Path(snapshot_dir), manifest["shards"])
+    return store
+
+
+# ── Local index ─────────────────────────────────────────────────────────
+def save_local(store, storage_dir: Path, settings: dict) -> None:
+    """
+    Save a collection's index next to its metadata database.  `settings`
+    are the ones the store was built with; "snapshot": True marks a store
+    configured by a snapshot manifest rather than the environment.
+    """
+    target = Path(storage_dir) / LOCAL_INDEX_DIR
+    staging = target.with_name(target.name + ".partial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    _save_index(store, staging, settings["shards"])
+    manifest = {
+        "format": FORMAT_VERSION,
+        "model": MODEL_ID,
+        "dimension": store.dimension,
+        "chunker": CHUNKER_ID,
+        **settings,
+        "chunks": store.ntotal,
+    }
+    (staging / LOCAL_MANIFEST).write_text(json.dumps(manifest, indent=2))
+    shutil.rmtree(target, ignore_errors=True)
+    staging.rename(target)
+    log.info("Saved index of %d chunks to %s", manifest["chunks"], target)
+
+
+def load_local(storage_dir: Path, metadata_store: MetadataStore, dimension: int):
+    """
+    (store, settings) from the index saved by save_local, or None when
+    there is none or it no longer matches the model, the index settings
+    or the chunks in `metadata_store`.
+    """
+    directory = Path(storage_dir) / LOCAL_INDEX_DIR
+    try:
+        manifest = json.loads((directory / LOCAL_MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+    settings = {key: manifest.get(key) for key in SETTINGS}
+    if manifest.get("snapshot"):
+        settings["snapshot"] = True
+    elif settings != current_settings():
+        log.info("Index settings changed since %s was saved; rebuilding", directory)
+        return None
+    if (manifest.get("format"), manifest.get("model"), manifest.get("dimension"), manifest.get("chunker")) != (
+        FORMAT_VERSION, MODEL_ID, dimension, CHUNKER_ID,
+    ):
+        log.info("Model or chunker changed since %s was saved; rebuilding", directory)
+        return None
+
+    store = make_store(dimension, metadata_store, settings, storage_dir)
+    try:
+        _load_index(store, directory, settings["shards"])
+    except RuntimeError as e:
+        log.warning("Cannot read saved index %s (%s); rebuilding", directory, e)
+        return None
+    stored = np.sort(np.asarray(metadata_store.model_chunk_ids(MODEL_ID), dtype="int64"))
+    if not np.array_equal(np.sort(store.ids()), stored):
+        log.info("Saved index %s is out of date with metadata.db; rebuilding", directory)
+        return None
+    return store, settings
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build or verify index snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="Index a data folder into a snapshot")
+    build_cmd.add_argument("--data", type=Path, default=Path(__file__).resolve().parents[1] / "data")
+    build_cmd.add_argument("--out", type=Path, required=True)
+    verify_cmd = commands.add_parser("verify", help="Check a snapshot against this server's model")
+    verify_cmd.add_argument("snapshot", type=Path)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        manifest = build(args.data, args.out)
+    else:
+        try:
+            manifest = verify(args.snapshot, get_dimension())
+        except SnapshotError as e:
+            parser.exit(1, f"Invalid snapshot: {e}\n")
+    print(json.dumps({k: v for k, v in manifest.items() if k != "files"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+sqlite_db.py — Connection and transaction plumbing shared by the SQLite stores.
+
+File-backed databases run in WAL mode with one connection per thread, so
+readers never block on the writer; writes are serialised by a lock and
+grouped with `_transaction()`.  An in-memory database (":memory:") has a
+single shared connection, and reads take the lock too.  MetadataStore
+and EmbeddingCache subclass this and add their schema and queries.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+class SQLiteDatabase:
+    def __init__(self, path: str | Path = ":memory:", schema: str = ""):
+        self.path = str(path)
+        self.in_memory = self.path == ":memory:"
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        if self.in_memory:
+            self._shared = self._connect()
+        else:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if schema:
+            with self._write_lock:
+                self._conn().executescript(schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        if not self.in_memory:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        if self.in_memory:
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _read(self, sql: str, params=()) -> list:
+        if self.in_memory:
+            with self._write_lock:
+                return self._conn().execute(sql, params).fetchall()
+        return self._conn().execute(sql, params).fetchall()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the block as one write transaction (rolled back on error)."""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
@@ -1,30 +1,339 @@
+import os
+import logging
+import itertools
+import tempfile
+import threading
 import faiss
 import numpy as np
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.metadata_store import MetadataStore
+
+log = logging.getLogger(__name__)
+
+# "flat" keeps float32 vectors; "sqfp16" / "sq8" store them scalar-quantized
+# (2x / 4x smaller).  RESCORE_FACTOR > 0 re-ranks top_k * factor approximate
+# candidates with exact float32 scores read from a memory-mapped file.
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "0"))
+
+QUANTIZERS = {
+    "sqfp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+INDEX_TYPES = ("flat", *QUANTIZERS)
+
+# REDUCE_DIM > 0 searches a REDUCTION-projected copy of the vectors
+# ("pca" fitted at ingestion, or "truncate" for Matryoshka-style models)
+# and re-scores the candidates at full dimension.
+REDUCE_DIM = int(os.getenv("REDUCE_DIM", "0"))
+REDUCTION = os.getenv("REDUCTION", "pca")
+REDUCTIONS = ("pca", "truncate")
+DEFAULT_RESCORE_FACTOR = 4
+
+# SQ8 and PCA are learned from data; vectors stay in an exact flat index
+# until this many have been added, then the index is trained on them.
+INDEX_TRAIN_MIN = int(os.getenv("INDEX_TRAIN_MIN", "256"))
+
+# Process-wide stamps for index versions: every change to any store takes
+# a new one, so a rebuilt or reloaded store never reuses an old version.
+_versions = itertools.count(1)
+
+
+def _make_index(dimension: int, index_type: str):
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dimension)
+    if index_type not in QUANTIZERS:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    return faiss.IndexScalarQuantizer(dimension, QUANTIZERS[index_type], faiss.METRIC_INNER_PRODUCT)
+
+
+class Reduction:
+    """Projection of embeddings to fewer dimensions for candidate search."""
+
+    def __init__(self, dimension: int, out_dim: int, method: str = "pca"):
+        if method not in REDUCTIONS:
+            raise ValueError(f"Unknown reduction {method!r}; expected one of {REDUCTIONS}")
+        if not 0 < out_dim < dimension:
+            raise ValueError(f"Reduced dimension must be between 1 and {dimension - 1}")
+        self.method = method
+        self.out_dim = out_dim
+        self._pca = faiss.PCAMatrix(dimension, out_dim) if method == "pca" else None
+
+    def fit(self, vectors: np.ndarray) -> None:
+        if self._pca is not None:
+            self._pca.train(vectors)
+            # Project without re-centring: x·A keeps inner products with the
+            # query comparable, where (x - mean)·A would add a per-vector bias.
+            faiss.copy_array_to_vector(np.zeros(self.out_dim, dtype="float32"), self._pca.b)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        if self._pca is not None:
+            return self._pca.apply(np.ascontiguousarray(vectors, dtype="float32"))
+        # A copy: normalize_L2 works in place, and a one-row slice would
+        # otherwise be a view of the caller's array.
+        prefix = np.array(vectors[:, :self.out_dim], dtype="float32", copy=True)
+        faiss.normalize_L2(prefix)
+        return prefix
+
+
+class FullVectors:
+    """
+    Float32 vectors on disk, one row per chunk id, read through a memmap.
+
+    Only the rows touched by re-scoring are paged in, so the full-precision
+    copy costs disk rather than resident memory.  Without a path the file
+    is an anonymous temporary file.
+    """
+
+    def __init__(self, dimension: int, path: Optional[Path] = None):
+        self.dimension = dimension
+        if path is None:
+            self._file = tempfile.TemporaryFile(suffix=".f32")
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "a+b")
+        self._rows = 0
+        self._map = None
+        self._remap(os.fstat(self._file.fileno()).st_size // (4 * dimension))
+
+    def _remap(self, rows: int) -> None:
+        self._file.truncate(rows * 4 * self.dimension)
+        self._rows = rows
+        self._map = np.memmap(self._file, dtype="float32", mode="r+", shape=(rows, self.dimension)) if rows else None
+
+    def write(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        needed = int(ids.max()) + 1
+        if needed > self._rows:
+            self._remap(max(needed, 2 * self._rows, 1024))
+        self._map[ids] = vectors
+
+    def flush(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+
+    def read(self, ids: np.ndarray) -> np.ndarray:
+        """Rows for `ids`; rows never written read as zeros."""
+        out = np.zeros((len(ids), self.dimension), dtype="float32")
+        present = ids < self._rows
+        if present.any():
+            out[present] = self._map[ids[present]]
+        return out
 
 
 class VectorStore:
-    def __init__(self, dimension: int):
-        self.index = faiss.IndexFlatIP(dimension)
-        self.text_chunks: List[str] = []
-        self.metadata: List[str] = []
+    """
+    FAISS index of chunk embeddings, keyed by chunk id.
 
-    def add(self, embeddings, chunks: List[str], sources: List[str]) -> None:
-        self.index.add(np.array(embeddings))
-        self.text_chunks.extend(chunks)
-        self.metadata.extend(sources)
+    Chunk text, sources and pages live in a MetadataStore (SQLite); the
+    index only maps chunk ids to vectors, so a hit is resolved with a
+    primary-key lookup.
+    """
 
-    def search(self, query_embedding, top_k: int = 3) -> List[Dict[str, Any]]:
-        scores, indices = self.index.search(query_embedding, top_k)
+    def __init__(
+        self,
+        dimension: int,
+        metadata_store: Optional[MetadataStore] = None,
+        index_type: str = "flat",
+        rescore_factor: int = 0,
+        vectors_path: Optional[Path] = None,
+        reduce_dim: int = 0,
+        reduction: str = "pca",
+        train_min: int = INDEX_TRAIN_MIN,
+    ):
+        self.dimension = dimension
+        self.index_type = index_type
+        self.reduction = Reduction(dimension, reduce_dim, reduction) if reduce_dim else None
+        search_dim = reduce_dim or dimension
+        inner = _make_index(search_dim, index_type)
+        self._trained = inner.is_trained and self.reduction is None
+        if not self._trained:
+            inner = faiss.IndexFlatIP(dimension)
+        # PCA cannot fit more output dimensions than it has vectors.
+        self._train_min = max(train_min, reduce_dim)
+        self.index = faiss.IndexIDMap2(inner)
+        self.metadata_store = metadata_store or MetadataStore()
+        # A reduced index is only a candidate generator: it always re-scores.
+        if self.reduction is not None:
+            rescore_factor = rescore_factor or DEFAULT_RESCORE_FACTOR
+        self.rescore_factor = rescore_factor
+        lossy = index_type != "flat" or self.reduction is not None
+        self.full_vectors = FullVectors(dimension, vectors_path) if rescore_factor > 0 and lossy else None
+        # Guards the index against the upload handler and the data-dir
+        # watcher mutating it mid-search.
+        self._lock = threading.RLock()
+        # Changes whenever the searchable vectors change (see semantic_cache).
+        self.version = next(_versions)
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        """Vectors as stored in (and searched against) the trained index."""
+        if self.reduction is None or not self._trained:
+            return vectors
+        return self.reduction.apply(vectors)
+
+    def _train(self) -> None:
+        """Move vectors from the staging flat index into the trained index."""
+        n = self.index.ntotal
+        vectors = self.index.index.reconstruct_n(0, n)
+        ids = faiss.vector_to_array(self.index.id_map)
+        if self.reduction is not None:
+            self.reduction.fit(vectors)
+            vectors = self.reduction.apply(vectors)
+        inner = _make_index(vectors.shape[1], self.index_type)
+        inner.train(vectors)
+        index = faiss.IndexIDMap2(inner)
+        index.add_with_ids(vectors, ids)
+        self.index = index
+        self._trained = True
+        log.info("Trained %s index (%d dims) on %d vectors", self.index_type, vectors.shape[1], n)
+
+    def _add_vectors(self, ids: List[int], embeddings) -> None:
+        if ids:
+            vectors = np.ascontiguousarray(embeddings, dtype="float32")
+            ids = np.asarray(ids, dtype="int64")
+            self.index.add_with_ids(self._project(vectors), ids)
+            if self.full_vectors is not None:
+                self.full_vectors.write(ids, vectors)
+            if not self._trained and self.index.ntotal >= self._train_min:
+                self._train()
+            self.version = next(_versions)
+
+    def _remove_vectors(self, ids: List[int]) -> None:
+        if ids:
+            self.index.remove_ids(np.asarray(ids, dtype="int64"))
+            self.version = next(_versions)
+
+    def add(
+        self,
+        embeddings,
+        chunks: List[str],
+        sources: List[str],
+        pages: Optional[List[Optional[int]]] = None,
+    ) -> None:
+        pages = pages if pages is not None else [None] * len(chunks)
+        with self._lock:
+            ids = self.metadata_store.add_chunks(sources, chunks, pages)
+            self._add_vectors(ids, embeddings)
+
+    def attach(self, ids: List[int], embeddings, sources: Optional[List[str]] = None) -> None:
+        """Add vectors for chunks already present in the metadata store."""
+        with self._lock:
+            self._add_vectors(ids, embeddings)
+
+    def remove_source(self, source: str) -> int:
+        """Drop every chunk of a document. Returns the number removed."""
+        with self._lock:
+            ids = self.metadata_store.delete_document(source)
+            self._remove_vectors(ids)
+            return len(ids)
+
+    def replace_source(
+        self,
+        source: str,
+        embeddings,
+        chunks: List[str],
+        pages: Optional[List[Optional[int]]] = None,
+        **document_fields,
+    ) -> None:
+        """Atomically swap a document's chunks for a new set."""
+        pages = pages if pages is not None else [None] * len(chunks)
+        with self._lock:
+            if not chunks:
+                self.remove_source(source)
+                return
+            new_ids, old_ids = self.metadata_store.replace_document(
+                source, chunks, pages, **document_fields
+            )
+            self._remove_vectors(old_ids)
+            self._add_vectors(new_ids, embeddings)
+
+    def documents(self) -> List[str]:
+        """Names of all indexed documents."""
+        return self.metadata_store.document_names()
+
+    @property
+    def trained(self) -> bool:
+        """False while vectors are still held in the exact staging index."""
+        return self._trained
+
+    @property
+    def ntotal(self) -> int:
+        """Number of vectors in the index."""
+        return self.index.ntotal
+
+    def ids(self) -> np.ndarray:
+        """Chunk ids of the indexed vectors."""
+        with self._lock:
+            return faiss.vector_to_array(self.index.id_map).astype("int64")
+
+    def save(self, path: Path) -> None:
+        """Write the index (and a fitted PCA projection) to disk, and flush
+        the full-precision vectors file."""
+        with self._lock:
+            faiss.write_index(self.index, str(path))
+            if self.full_vectors is not None:
+                self.full_vectors.flush()
+            if self.reduction is not None and self.reduction._pca is not None and self._trained:
+                faiss.write_VectorTransform(self.reduction._pca, f"{path}.pca")
+
+    def load(self, path: Path) -> None:
+        """Replace the index with one written by save()."""
+        index = faiss.read_index(str(path))
+        if self.reduction is not None:
+            trained = index.d == self.reduction.out_dim
+            if trained and self.reduction._pca is not None:
+                self.reduction._pca = faiss.read_VectorTransform(f"{path}.pca")
+        else:
+            trained = self.index_type == "flat" or not isinstance(
+                faiss.downcast_index(index.index), faiss.IndexFlat
+            )
+        with self._lock:
+            self.index = index
+            self._trained = trained
+            self.version = next(_versions)
+
+    def memory_bytes(self) -> int:
+        """Serialized size of the index (vectors plus id map)."""
+        with self._lock:
+            return int(faiss.serialize_index(self.index).nbytes)
+
+    def _rescore(self, query_embedding, scores, ids, top_k: int):
+        """Exact float32 scores for the quantized candidates; keeps the best top_k."""
+        found = ids[0] != -1
+        ids, approx = ids[0][found], scores[0][found]
+        if not len(ids):
+            return approx, ids
+        exact = self.full_vectors.read(ids) @ np.asarray(query_embedding, dtype="float32")[0]
+        order = np.argsort(-exact, kind="stable")[:top_k]
+        return exact[order], ids[order]
+
+    def search_ids(self, query_embedding, top_k: int = 3) -> List[Tuple[int, float]]:
+        """(chunk id, score) pairs for the best top_k vectors, best first."""
+        with self._lock:
+            # An untrained store is still exact; nothing to re-score.
+            rescore = self.full_vectors is not None and self._trained
+            fetch_k = top_k * self.rescore_factor if rescore else top_k
+            scores, ids = self.index.search(self._project(query_embedding), fetch_k)
+            if rescore:
+                scores, ids = self._rescore(query_embedding, scores, ids, top_k)
+            else:
+                scores, ids = scores[0], ids[0]
+
+        return [(int(i), float(s)) for i, s in zip(ids, scores) if i != -1]
+
+    def resolve(self, hits: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        """Attach chunk text, source and page to (chunk id, score) hits."""
+        rows = self.metadata_store.get_chunks([i for i, _ in hits])
         results = []
 
-        for idx, score in zip(indices[0], scores[0]):
-            if idx == -1:          # FAISS returns -1 when fewer results exist
+        for chunk_id, score in hits:
+            row = rows.get(chunk_id)
+            if row is None:        # removed between search and lookup
                 continue
-            results.append({
-                "text": self.text_chunks[idx],
-                "source": self.metadata[idx],
-                "score": float(score),
-            })
+            results.append({**row, "score": score})
 
         return results
+
+    def search(self, query_embedding, top_k: int = 3) -> List[Dict[str, Any]]:
+        return self.resolve(self.search_ids(query_embedding, top_k))
@@ -0,0 +1,158 @@
+"""
+watcher.py — Background watcher for incremental indexing of data/.
+
+Created, modified and deleted files in the data directory are picked
+up without a restart.  Events are debounced per file — an editor save
+or a large copy fires many events, but the file is only re-indexed
+once it has been quiet for `debounce` seconds.
+
+Uses watchdog (inotify on Linux) when it is installed and falls back
+to polling the directory's (mtime, size) snapshot otherwise.
+"""
+
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+
+from app.indexer import is_indexable
+
+log = logging.getLogger(__name__)
+
+
+class DataDirWatcher:
+    def __init__(self, indexer, debounce: float = 1.0, poll_interval: float = 2.0):
+        self.indexer = indexer
+        # Resolved once, so events for a data dir reached through a
+        # symlink compare equal to it.
+        self.data_dir = Path(indexer.data_dir).resolve()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+
+        self._pending: dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._observer = None
+
+    # ── Event intake ────────────────────────────────────────────────────
+    def notify(self, path: str) -> None:
+        """Record a change to `path`; it is processed after the debounce."""
+        name = os.path.basename(path)
+        if Path(path).parent.resolve() != self.data_dir:
+            return
+        if not is_indexable(name):
+            return
+        with self._cond:
+            self._pending[name] = time.monotonic()
+            self._cond.notify()
+
+    def _start_watchdog(self) -> bool:
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                watcher.notify(event.src_path)
+                dest = getattr(event, "dest_path", "")
+                if dest:
+                    watcher.notify(dest)
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), str(self.data_dir), recursive=False)
+        self._observer.start()
+        return True
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        snap = {}
+        try:
+            entries = list(os.scandir(self.data_dir))
+        except FileNotFoundError:
+            return snap
+        for entry in entries:
+            if not entry.is_file() or not is_indexable(entry.name):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            snap[entry.name] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def _poll_loop(self, previous: dict[str, tuple[int, int]]) -> None:
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            for name in previous.keys() | current.keys():
+                if previous.get(name) != current.get(name):
+                    self.notify(str(self.data_dir / name))
+            previous = current
+
+    def pending(self) -> int:
+        """Number of files waiting for their debounce to expire."""
+        return len(self._pending)
+
+    # ── Event processing ────────────────────────────────────────────────
+    def _take_due(self) -> list[str]:
+        """Block until at least one pending file is quiet, then pop it."""
+        with self._cond:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                due = [n for n, t in self._pending.items() if now - t >= self.debounce]
+                if due:
+                    for name in due:
+                        del self._pending[name]
+                    return due
+                if self._pending:
+                    wait = self.debounce - (now - min(self._pending.values()))
+                else:
+                    wait = None
+                self._cond.wait(wait)
+            return []
+
+    def _apply(self, name: str) -> None:
+        path = self.data_dir / name
+        try:
+            if path.is_file():
+                self.indexer.index_path(path)
+            else:
+                self.indexer.remove(name)
+        except Exception as e:
+            log.error("Watcher failed to sync %s: %s", name, e)
+
+    def _work_loop(self) -> None:
+        while not self._stop.is_set():
+            for name in self._take_due():
+                self._apply(name)
+
+    # ── Lifecycle ───────────────────────────────────────────────────────
+    def start(self) -> None:
+        targets = [(self._work_loop, ())]
+        if self._start_watchdog():
+            log.info("Watching %s (watchdog)", self.data_dir)
+        else:
+            log.info("Watching %s (polling every %.1fs)", self.data_dir, self.poll_interval)
+            # Snapshot before returning so changes made right after start()
+            # are not folded into the baseline.
+            targets.append((self._poll_loop, (self._snapshot(),)))
+        for target, args in targets:
+            thread = threading.Thread(target=target, args=args, name="data-dir-watcher", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join(timeout=5)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend as `app`, the way uvicorn runs it from backend/.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
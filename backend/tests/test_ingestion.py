@@ -0,0 +1,74 @@
+"""
+Concurrency regressions for background ingestion.
+
+Embedding is replaced by a slow deterministic fake, so no model is
+loaded; the sentence-transformers package must still be importable.
+"""
+
+import time
+import zlib
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.indexer as indexer_module
+from app.api import create_routes
+from app.collection import CollectionManager
+
+DIM = 16
+
+
+def fake_embed(texts, model_name=None, use_cache=True):
+    time.sleep(0.2)
+    vectors = np.stack([
+        np.random.default_rng(zlib.crc32(t.encode())).standard_normal(DIM) for t in texts
+    ]).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer_module, "embed_texts", fake_embed)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for i in range(8):
+        (data_dir / f"doc{i}.txt").write_text(f"Document {i} about notice periods. " * 20)
+    manager = CollectionManager(DIM, default_data_dir=data_dir, root_dir=tmp_path / "collections", incremental=True)
+    yield manager
+    manager.stop()
+
+
+def test_upload_during_ingestion_stays_indexed(manager):
+    app = FastAPI()
+    app.include_router(create_routes(manager))
+    client = TestClient(app)
+
+    collection = manager.get()
+    assert not collection.index_complete
+    response = client.post(
+        "/documents/upload",
+        files={"files": ("zz_new.txt", b"Uploaded while the folder was still being indexed. " * 20)},
+    )
+    assert response.json()["added"] == ["zz_new.txt"]
+    assert not collection.index_complete, "ingestion finished before the upload; slow the fake encoder down"
+
+    assert collection.indexed.wait(30)
+    assert "zz_new.txt" in client.get("/documents").json()["documents"]
+    assert sorted(collection.vector_store.documents()) == sorted([f"doc{i}.txt" for i in range(8)] + ["zz_new.txt"])
+
+
+def test_deleted_file_is_dropped_at_startup(manager, tmp_path):
+    collection = manager.get()
+    assert collection.indexed.wait(30)
+    manager.stop()
+
+    (tmp_path / "data" / "doc0.txt").unlink()
+    restarted = CollectionManager(DIM, default_data_dir=tmp_path / "data", root_dir=tmp_path / "collections")
+    try:
+        collection = restarted.get()
+        assert collection.indexed.wait(30)
+        assert "doc0.txt" not in collection.vector_store.documents()
+    finally:
+        restarted.stop()
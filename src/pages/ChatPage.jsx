@@ -28,6 +28,29 @@ const QUICK_QUESTIONS = [
   'What are the minimum screening criteria for Python engineers?',
 ]
 
+/* Parse a text/event-stream response into { event, data } objects. */
+async function* readSse(response) {
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let sep
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, sep)
+      buffer = buffer.slice(sep + 2)
+      let event = 'message', data = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      }
+      yield { event, data: data ? JSON.parse(data) : {} }
+    }
+  }
+}
+
 function formatTime(d) { return d.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }) }
 function fileExt(name) { return (name.split('.').pop() || '').toLowerCase() }
 
@@ -122,19 +145,36 @@ export default function ChatPage() {
     setInput('')
     setLoading(true)
     try {
-      const { data } = await axios.post(`${API_BASE}/ask-recruiter`, {
-        question: q,
-        top_k: topK,
-        temperature,
-        source_filter: lockedDocs.length ? lockedDocs.map(d => d.name) : undefined,
-        ...apiParams,
-      }, { timeout: 30000 })
-      setMessages(prev => [...prev, {
-        id: Date.now() + 1, role: 'assistant',
-        text: data.answer, confidence: data.confidence,
-        source: data.source_documents ?? [], score: data.similarity_score,
-        timestamp: formatTime(new Date()),
-      }])
+      // Streamed: sources and confidence arrive as soon as retrieval is
+      // done, then the answer is appended section by section.
+      const res = await fetch(`${API_BASE}/ask-recruiter/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          question: q,
+          top_k: topK,
+          temperature,
+          source_filter: lockedDocs.length ? lockedDocs.map(d => d.name) : undefined,
+          ...apiParams,
+        }),
+        signal: AbortSignal.timeout(30000),
+      })
+      if (!res.ok) {
+        throw { response: { status: res.status, data: await res.json().catch(() => ({})) } }
+      }
+      const id = Date.now() + 1
+      for await (const { event, data } of readSse(res)) {
+        if (event === 'metadata') {
+          setMessages(prev => [...prev, {
+            id, role: 'assistant',
+            text: '', confidence: data.confidence,
+            source: data.source_documents ?? [], score: data.similarity_score,
+            timestamp: formatTime(new Date()),
+          }])
+        } else if (event === 'answer') {
+          setMessages(prev => prev.map(m => m.id === id ? { ...m, text: m.text + data.text } : m))
+        }
+      }
       setQueryCount(c => c + 1)
     } catch (err) {
       const offline = !err.response